@@ -7,16 +7,18 @@ import chromadb
 from langchain_groq import ChatGroq
 from langchain_community.vectorstores import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
+from zlm.utils.transcripts import TranscriptChatModel
 
 # Initialize LLM
-llm = ChatGroq(
+# LLM_TRANSCRIPT_MODE=record|replay records or replays the LLM calls (see zlm.utils.transcripts)
+llm = TranscriptChatModel(ChatGroq(
     groq_api_key="",
     model="llama3-8b-8192",
     temperature=0,
     max_tokens=None,
     timeout=None,
     max_retries=2,
-)
+))
 
 # Initialize ChromaDB (you are not storing it again, now it is stored on the disk)
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
@@ -10,9 +10,12 @@ Copyright (c) 2023-2024 Saurabh Zinjad. All rights reserved | https://github.com
 import os
 import json
 import re
+import glob
+import time
 import validators
 import numpy as np
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -22,10 +25,16 @@ from zlm.utils import utils
 from zlm.utils.latex_ops import latex_to_pdf
 from zlm.utils.llm_models import DeepSeekModel
 from zlm.utils.data_extraction import read_data_from_url, extract_text
-from zlm.utils.metrics import jaccard_similarity, overlap_coefficient, cosine_similarity, vector_embedding_similarity
+from zlm.utils.cache import ResponseCache, make_cache_key
+from zlm.utils.checkpoint import RunManifest, file_digest
+from zlm.utils.scheduler import StageScheduler
+from zlm.utils.tracing import tracer, propagate
+from zlm.utils.metrics import score_table
 from zlm.prompts.resume_prompt import CV_GENERATOR, RESUME_WRITER_PERSONA, JOB_DETAILS_EXTRACTOR, RESUME_DETAILS_EXTRACTOR
 from zlm.schemas.job_details_schema import JobDetails
-from zlm.variables import DEFAULT_LLM_MODEL, DEFAULT_LLM_PROVIDER, LLM_MAPPING, section_mapping
+from zlm.variables import DEFAULT_LLM_MODEL, DEFAULT_LLM_PROVIDER, LLM_MAPPING, RESUME_SECTION_CONCURRENCY, PIPELINE_MAX_WORKERS, PIPELINE_STAGE_TIMEOUTS, section_mapping
+from zlm.variables import RESPONSE_CACHE_DIR, RESUME_CACHE_MAX_BYTES, RESUME_EXTRACTOR_PROMPT_VERSION
+from zlm.variables import JD_CACHE_MAX_BYTES, JD_CACHE_URL_TTL
 
 module_dir = os.path.dirname(__file__)
 demo_data_path = os.path.join(module_dir, "demo_data", "user_profile.json")
@@ -40,6 +49,8 @@ class AutoApplyModel:
         api_key (str): The API key for Hugging Face.
         downloads_dir (str, optional): The directory to save downloaded files. Defaults to the default download folder.
         model (str, optional): The LLM model to use. Defaults to "deepseek-ai/DeepSeek-V3-0324".
+        llm (optional): An object with the DeepSeekModel interface to use instead of loading `model`.
+        cache_dir (str, optional): Directory of the resume and job details caches. Defaults to RESPONSE_CACHE_DIR.
 
     Methods:
         get_prompt(system_prompt_path: str) -> str: Returns the system prompt from the specified path.
@@ -48,11 +59,12 @@ class AutoApplyModel:
         job_details_extraction(url: str) -> dict: Extracts job details from the specified job URL.
         resume_builder(job_details: dict, user_data: dict) -> dict: Generates a resume based on job details and user data.
         cover_letter_generator(job_details: dict, user_data: dict) -> str: Generates a cover letter based on job details and user data.
-        resume_cv_pipeline(job_url: str, user_data_path: str) -> None: Runs the Auto Apply Pipeline.
+        calculate_metrics(resume_details: dict, user_data: dict, job_details: dict) -> dict: Scores the resume against the user data and job details.
+        resume_cv_pipeline(job_url: str, user_data_path: str) -> dict: Runs the Auto Apply Pipeline.
     """
 
     def __init__(
-        self, api_key: str = None, model: str = "deepseek-ai/DeepSeek-V3-0324", downloads_dir: str = utils.get_default_download_folder(), system_prompt: str = RESUME_WRITER_PERSONA
+        self, api_key: str = None, model: str = "deepseek-ai/DeepSeek-V3-0324", downloads_dir: str = utils.get_default_download_folder(), system_prompt: str = RESUME_WRITER_PERSONA, llm=None, cache_dir: str = RESPONSE_CACHE_DIR
     ):
         self.system_prompt = system_prompt
         self.model = model
@@ -63,18 +75,31 @@ class AutoApplyModel:
         else:
             self.api_key = api_key
 
-        self.llm = DeepSeekModel(api_key=self.api_key, system_prompt=self.system_prompt)
+        self.llm = llm if llm is not None else DeepSeekModel(api_key=self.api_key, system_prompt=self.system_prompt, model=self.model)
+        self.resume_cache = ResponseCache(cache_dir, name="resumes", max_bytes=RESUME_CACHE_MAX_BYTES)
+        self.jd_url_cache = ResponseCache(cache_dir, name="job_details_urls", max_bytes=JD_CACHE_MAX_BYTES, ttl=JD_CACHE_URL_TTL)
+        self.jd_text_cache = ResponseCache(cache_dir, name="job_details_texts", max_bytes=JD_CACHE_MAX_BYTES)
     
+    @utils.measure_execution_time
     def resume_to_json(self, pdf_path):
         """
         Converts a resume in PDF format to JSON format.
 
+        The result is cached by the SHA-256 of the PDF bytes, so uploading the same file again
+        skips both text extraction and the LLM call.
+
         Args:
             pdf_path (str): The path to the PDF file.
 
         Returns:
             dict: The resume data in JSON format.
         """
+        cache_key = make_cache_key(file_digest(pdf_path), RESUME_EXTRACTOR_PROMPT_VERSION, RESUME_DETAILS_EXTRACTOR, self.model, self.system_prompt)
+        cached = self.resume_cache.get(cache_key)
+        if cached is not None:
+            print("Reusing parsed resume from cache")
+            return json.loads(cached)
+
         resume_text = extract_text(pdf_path)
 
         json_parser = JsonOutputParser(pydantic_object=ResumeSchema)
@@ -86,6 +111,9 @@ class AutoApplyModel:
             ).format(resume_text=resume_text)
 
         resume_json = self.llm.get_response(prompt=prompt, need_json_output=True)
+
+        if isinstance(resume_json, dict) and resume_json:
+            self.resume_cache.set(cache_key, json.dumps(resume_json))
         return resume_json
 
     @utils.measure_execution_time
@@ -118,11 +146,34 @@ class AutoApplyModel:
         
         return user_data
 
+    def _jd_cache_key(self, url: str = None, job_site_content: str = None):
+        source = ("url", utils.canonical_url(url)) if url is not None else ("text", utils.text_fingerprint(job_site_content))
+        return make_cache_key(source, JOB_DETAILS_EXTRACTOR, self.model, self.system_prompt)
+
+    def _find_jd_file(self, url: str):
+        """Returns the job details of a JD JSON file written for the same posting within JD_CACHE_URL_TTL, or None."""
+        target = utils.canonical_url(url)
+        for jd_path in glob.glob(os.path.join(self.downloads_dir, "*", "*_JD.json")):
+            if time.time() - os.path.getmtime(jd_path) > JD_CACHE_URL_TTL:
+                continue
+            try:
+                job_details = utils.read_json(jd_path)
+            except (OSError, ValueError):
+                continue
+            if isinstance(job_details, dict) and job_details.get("url") and utils.canonical_url(job_details["url"]) == target:
+                del job_details["url"]
+                return job_details
+        return None
+
     @utils.measure_execution_time
     def job_details_extraction(self, url: str=None, job_site_content: str=None, is_st=False):
         """
         Extracts job details from the specified job URL.
 
+        Extracted details are cached by canonical URL (for JD_CACHE_URL_TTL seconds) and by the
+        normalized job description text, and JD JSON files already written to the downloads
+        directory for the same URL are reused, so a repeat posting needs no scraping or LLM call.
+
         Args:
             url (str): The URL of the job posting.
             job_site_content (str): The content of the job posting.
@@ -134,33 +185,78 @@ class AutoApplyModel:
         print("\nExtracting job details...")
 
         try:
-            # TODO: Handle case where it returns None. sometime, website take time to load, but scraper complete before that.
-            if url is not None and url.strip() != "":
-                job_site_content = read_data_from_url(url)
-            if job_site_content:
-                json_parser = JsonOutputParser(pydantic_object=JobDetails)
-                
-                prompt = PromptTemplate(
-                    template=JOB_DETAILS_EXTRACTOR,
-                    input_variables=["job_description"],
-                    partial_variables={"format_instructions": json_parser.get_format_instructions()}
-                    ).format(job_description=job_site_content)
-
-                job_details = self.llm.get_response(prompt=prompt, need_json_output=True)
-
-                if url is not None and url.strip() != "":
-                    job_details["url"] = url
-                jd_path = utils.job_doc_name(job_details, self.downloads_dir, "jd")
+            has_url = url is not None and url.strip() != ""
+            job_details = None
+
+            if has_url:
+                cached = self.jd_url_cache.get(self._jd_cache_key(url=url))
+                if cached is not None:
+                    print("Reusing cached job details for this URL")
+                    job_details = json.loads(cached)
+                else:
+                    job_details = self._find_jd_file(url)
+                    if job_details is not None:
+                        print("Reusing job details file written for this URL")
+                        self.jd_url_cache.set(self._jd_cache_key(url=url), json.dumps(job_details))
+                    else:
+                        # TODO: Handle case where it returns None. sometime, website take time to load, but scraper complete before that.
+                        job_site_content = read_data_from_url(url)
+
+            if job_details is None and job_site_content:
+                cached = self.jd_text_cache.get(self._jd_cache_key(job_site_content=job_site_content))
+                if cached is not None:
+                    print("Reusing cached job details for this job description")
+                    job_details, complete = json.loads(cached), True
+                else:
+                    json_parser = JsonOutputParser(pydantic_object=JobDetails)
+                    
+                    prompt = PromptTemplate(
+                        template=JOB_DETAILS_EXTRACTOR,
+                        input_variables=["job_description"],
+                        partial_variables={"format_instructions": json_parser.get_format_instructions()}
+                        ).format(job_description=job_site_content)
+
+                    complete = False
+                    if is_st:
+                        # Show the extracted fields while the model is still writing them
+                        placeholder = st.empty()
+                        try:
+                            for job_details, complete in self.llm.stream_json_response(prompt=prompt, return_complete=True):
+                                placeholder.write(job_details)
+                        except Exception as e:
+                            print(f"Streaming job details failed, retrying without streaming: {e}")
+                            job_details, complete = None, False
+                        placeholder.empty()
+
+                    if job_details is None:
+                        result = self.llm.get_response(prompt=prompt, need_json_output=True, return_complete=True)
+                        job_details, complete = result if result is not None else (None, False)
+
+                    # Details repaired after truncation are used for this run only, they may lack fields such as keywords
+                    if complete and isinstance(job_details, dict) and job_details:
+                        self.jd_text_cache.set(self._jd_cache_key(job_site_content=job_site_content), json.dumps(job_details))
+
+                if has_url and complete and isinstance(job_details, dict) and job_details:
+                    self.jd_url_cache.set(self._jd_cache_key(url=url), json.dumps(job_details))
+
+            if not job_site_content and job_details is None:
+                raise Exception("Unable to web scrape the job description.")
+            if not isinstance(job_details, dict) or not job_details:
+                raise Exception("Unable to extract job details from the job description.")
+
+            if has_url:
+                job_details["url"] = url
+            jd_path = utils.job_doc_name(job_details, self.downloads_dir, "jd")
 
+            # Reused details keep their file untouched, its age is what JD_CACHE_URL_TTL is checked against
+            if job_site_content or not os.path.exists(jd_path):
                 utils.write_json(jd_path, job_details)
-                print(f"Job Details JSON generated at: {jd_path}")
+            print(f"Job Details JSON generated at: {jd_path}")
 
-                if url is not None and url.strip() != "":
-                    del job_details['url']
-                
-                return job_details, jd_path
-            else:
-                raise Exception("Unable to web scrape the job description.")
+            if has_url:
+                del job_details['url']
+            
+            return job_details, jd_path
 
         except Exception as e:
             print(e)
@@ -176,6 +272,7 @@ class AutoApplyModel:
         Args:
             job_details (dict): A dictionary containing the job description.
             user_data (dict): A dictionary containing the user's resume or work information.
+            is_st (bool, optional): Stream the letter into the current Streamlit container while it is generated.
 
         Returns:
             str: The generated cover letter.
@@ -191,13 +288,18 @@ class AutoApplyModel:
                 input_variables=["my_work_information", "job_description"],
                 ).format(job_description=job_details, my_work_information=user_data)
 
-            cover_letter = self.llm.get_response(prompt=prompt, expecting_longer_output=True)
+            if is_st:
+                # Render the letter as it is generated instead of after the whole completion
+                cover_letter = st.write_stream(self.llm.stream_response(prompt=prompt, expecting_longer_output=True))
+            else:
+                cover_letter = self.llm.get_response(prompt=prompt, expecting_longer_output=True)
 
             cv_path = utils.job_doc_name(job_details, self.downloads_dir, "cv")
             utils.write_file(cv_path, cover_letter)
             print("Cover Letter generated at: ", cv_path)
             if need_pdf:
-                utils.text_to_pdf(cover_letter, cv_path.replace(".txt", ".pdf"))
+                with tracer.span("text_to_pdf"):
+                    utils.text_to_pdf(cover_letter, cv_path.replace(".txt", ".pdf"))
                 print("Cover Letter PDF generated at: ", cv_path.replace(".txt", ".pdf"))
             
             return cover_letter, cv_path.replace(".txt", ".pdf")
@@ -207,14 +309,40 @@ class AutoApplyModel:
             return None, None
 
 
+    def _build_section(self, section: str, job_details: dict, user_data: dict):
+        """
+        Generates a single resume section with the LLM.
+
+        The section prompt holds the section's user data and the whole job details, so a repeated section
+        with unchanged inputs is served by the LLM response cache; no separate section memo is kept.
+
+        Args:
+            section (str): The section name, a key of section_mapping.
+            job_details (dict): A dictionary containing the job description.
+            user_data (dict): A dictionary containing the user's resume or work information.
+
+        Returns:
+            dict: The parsed LLM response for the section.
+        """
+        with tracer.span("resume_section", section=section):
+            json_parser = JsonOutputParser(pydantic_object=section_mapping[section]["schema"])
+        
+            prompt = PromptTemplate(
+                template=section_mapping[section]["prompt"],
+                partial_variables={"format_instructions": json_parser.get_format_instructions()}
+                ).format(section_data = json.dumps(user_data[section]), job_description = json.dumps(job_details))
+
+            return self.llm.get_response(prompt=prompt, expecting_longer_output=True, need_json_output=True)
+
     @utils.measure_execution_time
-    def resume_builder(self, job_details: dict, user_data: dict, is_st=False):
+    def resume_builder(self, job_details: dict, user_data: dict, is_st=False, max_workers: int = RESUME_SECTION_CONCURRENCY):
         """
         Builds a resume based on the provided job details and user data.
 
         Args:
             job_details (dict): A dictionary containing the job description.
             user_data (dict): A dictionary containing the user's resume or work information.
+            max_workers (int, optional): How many sections are generated concurrently. 1 generates them sequentially.
 
         Returns:
             dict: The generated resume details.
@@ -241,18 +369,41 @@ class AutoApplyModel:
             st.write(resume_details)
 
             # Other Sections
-            for section in ['work_experience', 'projects', 'skill_section', 'education', 'certifications', 'achievements']:
-                section_log = f"Processing Resume's {section.upper()} Section..."
-                if is_st: st.toast(section_log)
-
-                json_parser = JsonOutputParser(pydantic_object=section_mapping[section]["schema"])
-                
-                prompt = PromptTemplate(
-                    template=section_mapping[section]["prompt"],
-                    partial_variables={"format_instructions": json_parser.get_format_instructions()}
-                    ).format(section_data = json.dumps(user_data[section]), job_description = json.dumps(job_details))
-
-                response = self.llm.get_response(prompt=prompt, expecting_longer_output=True, need_json_output=True)
+            sections = ['work_experience', 'projects', 'skill_section', 'education', 'certifications', 'achievements']
+            responses = dict()
+
+            if max_workers is None or max_workers <= 1:
+                for section in sections:
+                    section_log = f"Processing Resume's {section.upper()} Section..."
+                    if is_st: st.toast(section_log)
+                    responses[section] = self._build_section(section, job_details, user_data)
+                    if is_st:
+                        st.markdown(f"**{section.upper()} Section**")
+                        st.write(responses[section])
+            else:
+                # Sections only depend on user_data and job_details, so all prompts are dispatched at once.
+                # Streamlit calls stay on this thread; workers only talk to the LLM.
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(sections))) as executor:
+                    futures = dict()
+                    for section in sections:
+                        if is_st: st.toast(f"Processing Resume's {section.upper()} Section...")
+                        futures[executor.submit(propagate(self._build_section), section, job_details, user_data)] = section
+
+                    for future in as_completed(futures):
+                        section = futures[future]
+                        try:
+                            responses[section] = future.result()
+                        except Exception as e:
+                            print(f"{section} section failed: {e}")
+                            responses[section] = None
+                        if is_st:
+                            st.toast(f"Resume's {section.upper()} Section is ready.")
+                            st.markdown(f"**{section.upper()} Section**")
+                            st.write(responses[section])
+
+            # Merge in canonical section order, whatever order the responses arrived in
+            for section in sections:
+                response = responses.get(section)
 
                 # Check for empty sections
                 if response is not None and isinstance(response, dict):
@@ -262,10 +413,6 @@ class AutoApplyModel:
                                 resume_details[section] = [i for i in response['skill_section'] if len(i['skills'])]
                             else:
                                 resume_details[section] = response[section]
-                
-                if is_st:
-                    st.markdown(f"**{section.upper()} Section**")
-                    st.write(response)
 
             resume_details['keywords'] = ', '.join(job_details['keywords'])
             
@@ -275,7 +422,8 @@ class AutoApplyModel:
             resume_path = resume_path.replace(".json", ".pdf")
             # st.write(f"resume_path: {resume_path}")
 
-            resume_latex = latex_to_pdf(resume_details, resume_path)
+            with tracer.span("latex_to_pdf"):
+                resume_latex = latex_to_pdf(resume_details, resume_path)
             # st.write(f"resume_pdf_path: {resume_pdf_path}")
 
             return resume_path, resume_details
@@ -284,59 +432,127 @@ class AutoApplyModel:
             st.write("Error: \n\n",e)
             return resume_path, resume_details
 
-    def resume_cv_pipeline(self, job_url: str, user_data_path: str = demo_data_path):
+    @utils.measure_execution_time
+    def calculate_metrics(self, resume_details: dict, user_data: dict, job_details: dict, metrics: list = ['jaccard_similarity', 'overlap_coefficient', 'cosine_similarity']):
+        """
+        Prints and returns the similarity scores between the generated resume, the user data and the job details.
+
+        Each document is normalized once and every metric is computed from that, see metrics.score_table.
+
+        Args:
+            resume_details (dict): The generated resume details.
+            user_data (dict): A dictionary containing the user's resume or work information.
+            job_details (dict): A dictionary containing the job description.
+            metrics (list, optional): Names of the metric functions to compute.
+
+        Returns:
+            dict: The user personalization, job alignment and job match scores per metric.
+        """
+        documents = {"resume": json.dumps(resume_details), "user_data": json.dumps(user_data), "job_details": json.dumps(job_details)}
+        pairs = {
+            "user_personlization": ("resume", "user_data"),
+            "job_alignment": ("resume", "job_details"),
+            "job_match": ("user_data", "job_details"),
+        }
+        scores = score_table(documents, pairs, metrics, llm=self.llm)
+
+        for metric in metrics:
+            print(f"\nCalculating {metric}...")
+            print("User Personlization Score(resume,master_data): ", scores[metric]["user_personlization"])
+            print("Job Alignment Score(resume,JD): ", scores[metric]["job_alignment"])
+            print("Job Match Score(master_data,JD): ", scores[metric]["job_match"])
+        return scores
+
+    @utils.measure_execution_time
+    def resume_cv_pipeline(self, job_url: str, user_data_path: str = demo_data_path, resume_from_checkpoint: bool = False, user_data: dict = None, job_site_content: str = None):
         """Run the Auto Apply Pipeline.
 
+        The stages form a dependency graph: user data and job details are extracted concurrently,
+        then the resume and the cover letter are generated concurrently, and the metrics run once
+        the resume is ready. A timing report with the critical path is printed at the end.
+
+        Every stage output is recorded in a run manifest under `<downloads_dir>/.runs`, keyed by a
+        hash of the stage inputs, so a failed run can be retried without redoing finished stages.
+
         Args:
             job_url (str): The URL of the job to apply for.
             user_data_path (str, optional): The path to the user profile data file.
                 Defaults to os.path.join(module_dir, "master_data','user_profile.json").
+            resume_from_checkpoint (bool, optional): Skip stages whose recorded outputs are still valid.
+            user_data (dict, optional): Already extracted user data; skips extracting it from user_data_path.
+            job_site_content (str, optional): Job description text to use instead of scraping job_url.
 
         Returns:
-            None: The function prints the progress and results to the console.
+            dict: "stages" holds the results of the stages that succeeded, "errors" the error of each
+                failed or skipped stage and "timings" the start/end offsets of each stage in seconds.
         """
         try:
             if user_data_path is None or user_data_path.strip() == "":
                 user_data_path = demo_data_path
 
             print("Starting Auto Resume and CV Pipeline")
-            if job_url is None and len(job_url.strip()) == "":
-                print("Job URL is required.")
+            if (job_url is None or job_url.strip() == "") and not job_site_content:
+                print("Job URL or job description is required.")
                 return
-            
-            # Extract user data
-            user_data = self.user_data_extraction(user_data_path)
-
-            # Extract job details
-            job_details, jd_path = self.job_details_extraction(url=job_url)
-            # job_details = read_json("/Users/saurabh/Downloads/JobLLM_Resume_CV/Netflix/Netflix_MachineLearning_JD.json")
-
-            # Build resume
-            resume_path, resume_details = self.resume_builder(job_details, user_data)
-            # resume_details = read_json("/Users/saurabh/Downloads/JobLLM_Resume_CV/Netflix/Netflix_MachineLearning_resume.json")
 
-            # Generate cover letter
-            cv_details, cv_path = self.cover_letter_generator(job_details, user_data)
+            def extract_user_data():
+                return user_data if user_data is not None else self.user_data_extraction(user_data_path)
 
-            # Calculate metrics
-            for metric in ['jaccard_similarity', 'overlap_coefficient', 'cosine_similarity']:
-                print(f"\nCalculating {metric}...")
-
-                if metric == 'vector_embedding_similarity':
-                    llm = self.get_llm_instance('')
-                    user_personlization = globals()[metric](llm, json.dumps(resume_details), json.dumps(user_data))
-                    job_alignment = globals()[metric](llm, json.dumps(resume_details), json.dumps(job_details))
-                    job_match = globals()[metric](llm, json.dumps(user_data), json.dumps(job_details))
+            def extract_job_details():
+                if job_site_content:
+                    job_details, jd_path = self.job_details_extraction(job_site_content=job_site_content)
                 else:
-                    user_personlization = globals()[metric](json.dumps(resume_details), json.dumps(user_data))
-                    job_alignment = globals()[metric](json.dumps(resume_details), json.dumps(job_details))
-                    job_match = globals()[metric](json.dumps(user_data), json.dumps(job_details))
-
-                print("User Personlization Score(resume,master_data): ", user_personlization)
-                print("Job Alignment Score(resume,JD): ", job_alignment)
-                print("Job Match Score(master_data,JD): ", job_match)
+                    job_details, jd_path = self.job_details_extraction(url=job_url)
+                if job_details is None:
+                    raise Exception("Unable to extract job details.")
+                return job_details
+
+            def generate_resume(user_data, job_details):
+                resume_path, resume_details = self.resume_builder(job_details, user_data)
+                if resume_details is None or not os.path.exists(resume_path):
+                    raise Exception("Unable to build the resume PDF.")
+                return resume_path, resume_details
+
+            def generate_cover_letter(user_data, job_details):
+                cv_details, cv_path = self.cover_letter_generator(job_details, user_data)
+                if cv_details is None:
+                    raise Exception("Unable to generate the cover letter.")
+                return cv_details, cv_path
+
+            # Stage inputs: the user data file content (not just its path), the job URL and the model setup
+            if user_data is not None:
+                user_data_input = make_cache_key(user_data)
+            else:
+                user_data_input = file_digest(user_data_path) if os.path.isfile(user_data_path) else user_data_path
+            job_input = job_site_content if job_site_content else job_url
+            model_input = (self.model, self.system_prompt)
+            run_key = make_cache_key(job_input, user_data_input, model_input)[:16]
+            manifest = RunManifest(os.path.join(self.downloads_dir, ".runs", f"{run_key}.json"))
+
+            def checkpointed(stage, inputs, func, files=lambda output: []):
+                return manifest.checkpointed(stage, inputs, func, files, resume=resume_from_checkpoint)
+
+            scheduler = StageScheduler(max_workers=PIPELINE_MAX_WORKERS)
+            scheduler.add("user_data", checkpointed("user_data", (user_data_input, model_input), extract_user_data),
+                          timeout=PIPELINE_STAGE_TIMEOUTS.get("user_data"))
+            scheduler.add("job_details", checkpointed("job_details", (job_input, model_input), extract_job_details),
+                          timeout=PIPELINE_STAGE_TIMEOUTS.get("job_details"))
+            scheduler.add("resume", checkpointed("resume", (model_input,), generate_resume, lambda output: [output[0]]),
+                          deps=["user_data", "job_details"], timeout=PIPELINE_STAGE_TIMEOUTS.get("resume"))
+            scheduler.add("cover_letter", checkpointed("cover_letter", (model_input,), generate_cover_letter, lambda output: [output[1]]),
+                          deps=["user_data", "job_details"], timeout=PIPELINE_STAGE_TIMEOUTS.get("cover_letter"))
+            scheduler.add("metrics", checkpointed("metrics", (), lambda resume, user_data, job_details: self.calculate_metrics(resume[1], user_data, job_details)),
+                          deps=["resume", "user_data", "job_details"], timeout=PIPELINE_STAGE_TIMEOUTS.get("metrics"))
+
+            results = scheduler.run()
+            print(f"\n{scheduler.report()}")
 
             print("\nDone!!!")
+            return {
+                "stages": results,
+                "errors": {name: str(error) for name, error in scheduler.errors.items()},
+                "timings": scheduler.timings,
+            }
         except Exception as e:
             print(e)
-            return None
\ No newline at end of file
+            return None
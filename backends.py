@@ -0,0 +1,59 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/backends.py
+Creation Time: Oct 18th 2026, 5:10 pm
+-----------------------------------------------------------------------
+'''
+from transformers import AutoTokenizer, pipeline
+
+# name -> description, and whether the backend runs a torch model that accepts a reusable KV cache
+BACKENDS = {
+    "transformers": {"description": "Full precision transformers pipeline", "prefix_cache": True},
+    "int8": {"description": "Linear layers quantized to int8 with torch dynamic quantization (CPU)", "prefix_cache": True},
+    "onnx": {"description": "Graph exported to ONNX and run by ONNX Runtime (requires optimum[onnxruntime])", "prefix_cache": False},
+}
+
+
+def supports_prefix_cache(backend: str) -> bool:
+    return BACKENDS[backend]["prefix_cache"]
+
+
+def load_pipeline(task: str, model: str, backend: str = "transformers", **kwargs):
+    """
+    Builds a pipeline for `model` on the requested inference backend.
+
+    Args:
+        task (str): The pipeline task, e.g. "text-generation".
+        model (str): The model id or local path.
+        backend (str, optional): One of BACKENDS. Defaults to "transformers".
+        **kwargs: Extra arguments forwarded to transformers.pipeline.
+
+    Returns:
+        transformers.Pipeline: The loaded pipeline.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+
+    if backend == "transformers":
+        return pipeline(task, model=model, **kwargs)
+
+    if backend == "int8":
+        import torch
+
+        client = pipeline(task, model=model, **kwargs)
+        if client.model.device.type != "cpu":
+            raise ValueError("The int8 backend uses torch dynamic quantization, which only runs on CPU.")
+        torch.ao.quantization.quantize_dynamic(client.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return client
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError:
+            raise ImportError("The onnx backend needs optimum with ONNX Runtime: pip install optimum[onnxruntime]")
+
+        trust_remote_code = kwargs.pop("trust_remote_code", False)
+        kwargs.pop("torch_dtype", None)
+        ort_model = ORTModelForCausalLM.from_pretrained(model, export=True, trust_remote_code=trust_remote_code)
+        tokenizer = AutoTokenizer.from_pretrained(model, trust_remote_code=trust_remote_code)
+        return pipeline(task, model=ort_model, tokenizer=tokenizer, **kwargs)
@@ -0,0 +1,414 @@
+"""
+-----------------------------------------------------------------------
+File: benchmark.py
+Creation Time: Oct 18th 2026, 5:45 pm
+-----------------------------------------------------------------------
+"""
+
+import os
+import io
+import re
+import json
+import math
+import time
+import shutil
+import random
+import hashlib
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+import multiprocessing
+from threading import Thread
+
+DEFAULT_PROMPTS = [
+    "Summarize the responsibilities of a machine learning engineer in three sentences.",
+    "List five skills a data analyst should highlight on a resume.",
+    "Write a short professional summary for a backend developer with four years of Python experience.",
+]
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak if platform.system().lower() == "darwin" else peak * 1024
+
+
+def run_backend(model, backend, prompts, max_new_tokens, queue):
+    """Measures one backend; runs in its own process so peak RSS is not shared between backends."""
+    try:
+        from transformers import TextIteratorStreamer
+        from zlm.utils.backends import load_pipeline
+
+        start_time = time.time()
+        client = load_pipeline("text-generation", model=model, backend=backend, trust_remote_code=True)
+        load_time = time.time() - start_time
+
+        # Warm-up so one-time initialisation does not count as first-token latency
+        client(prompts[0], max_new_tokens=4, return_full_text=False)
+
+        first_token_latencies, generated_tokens, generation_time = [], 0, 0.0
+        for prompt in prompts:
+            streamer = TextIteratorStreamer(client.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            worker = Thread(target=client, args=(prompt,), kwargs={"streamer": streamer, "max_new_tokens": max_new_tokens, "return_full_text": False})
+
+            start_time = time.time()
+            worker.start()
+            first_token_latency, pieces = None, []
+            for text in streamer:
+                if first_token_latency is None and text:
+                    first_token_latency = time.time() - start_time
+                pieces.append(text)
+            worker.join()
+            generation_time += time.time() - start_time
+
+            first_token_latencies.append(first_token_latency or 0.0)
+            generated_tokens += len(client.tokenizer("".join(pieces), add_special_tokens=False)["input_ids"])
+
+        queue.put({
+            "backend": backend,
+            "load_time": load_time,
+            "tokens_per_sec": generated_tokens / generation_time if generation_time else 0.0,
+            "first_token_latency": sum(first_token_latencies) / len(first_token_latencies),
+            "peak_rss_mb": peak_rss_bytes() / (1024 * 1024),
+            "generated_tokens": generated_tokens,
+        })
+    except Exception as e:
+        queue.put({"backend": backend, "error": str(e)})
+
+
+def benchmark_backends(args):
+    """Runs the same prompts on every requested backend and reports throughput, latency and memory."""
+    prompts = DEFAULT_PROMPTS
+    if args.prompts:
+        with open(args.prompts) as file:
+            prompts = [line.strip() for line in file if line.strip()]
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in args.backends:
+        print(f"\nBenchmarking {backend} backend...")
+        queue = context.Queue()
+        process = context.Process(target=run_backend, args=(args.model, backend, prompts, args.max_new_tokens, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+
+    print(f"\n{'backend':<14}{'load s':>10}{'tokens/s':>12}{'first token s':>16}{'peak RSS MB':>14}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<14}  failed: {result['error']}")
+        else:
+            print(f"{result['backend']:<14}{result['load_time']:>10.2f}{result['tokens_per_sec']:>12.2f}{result['first_token_latency']:>16.3f}{result['peak_rss_mb']:>14.1f}")
+    return results
+
+
+class StubLLM:
+    """
+    A deterministic stand-in for DeepSeekModel, so the pipeline's own overhead can be measured without a model.
+
+    Prompts are recognised by the literal text of the prompt template they were built from. Section
+    prompts are answered with the profile's own section, the job details prompt with the synthetic job
+    details and anything else (the cover letter) with fixed text. Every call sleeps `latency` seconds.
+    """
+
+    def __init__(self, profile: dict, job_details: dict, latency: float = 0.0):
+        from zlm.prompts.resume_prompt import JOB_DETAILS_EXTRACTOR
+        from zlm.variables import section_mapping
+
+        self.profile = profile
+        self.job_details = job_details
+        self.latency = latency
+        self.json_tokens_saved = 0
+        self.templates = [(self._signature(section_mapping[section]["prompt"]), section) for section in section_mapping]
+        self.templates.append((self._signature(JOB_DETAILS_EXTRACTOR), "job_details"))
+
+    @staticmethod
+    def _signature(template: str) -> str:
+        # The longest piece of literal text between placeholders identifies the template
+        return max(re.split(r"\{[^{}]*\}", template), key=len).strip()
+
+    def _answer(self, prompt: str, need_json_output: bool):
+        time.sleep(self.latency)
+        for signature, name in self.templates:
+            if signature and signature in prompt:
+                if name == "job_details":
+                    response = dict(self.job_details)
+                else:
+                    response = {name: self.profile.get(name)}
+                return response if need_json_output else json.dumps(response)
+
+        letter = "\n\n".join(f"I am excited to apply for the {self.job_details['job_title']} role. " * 3 for _ in range(4))
+        return {"text": letter} if need_json_output else letter
+
+    def get_response(self, prompt, expecting_longer_output=False, need_json_output=False, bypass_cache=False, return_complete=False):
+        response = self._answer(prompt, need_json_output)
+        return (response, True) if need_json_output and return_complete else response
+
+    def get_responses(self, prompts, expecting_longer_output=False, need_json_output=False, **kwargs):
+        return [self._answer(prompt, need_json_output) for prompt in prompts]
+
+    def stream_response(self, prompt, expecting_longer_output=False, bypass_cache=False, need_json_output=False):
+        yield self._answer(prompt, False)
+
+    def get_embeddings(self, texts, *args, **kwargs):
+        import numpy as np
+        rows = [np.random.default_rng(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)).standard_normal(64) for text in texts]
+        return np.asarray(rows, dtype=np.float32)
+
+
+def make_profile(size: int) -> dict:
+    """Builds a synthetic candidate profile whose sections grow linearly with `size`."""
+    rng = random.Random(size)
+    skills = ["Python", "SQL", "Docker", "Kubernetes", "PyTorch", "Spark", "AWS", "React", "Go", "Terraform", "Airflow", "Kafka"]
+    return {
+        "name": "Jordan Doe",
+        "phone": "+1 555 0100",
+        "email": "jordan.doe@example.com",
+        "media": {"github": "https://github.com/jordandoe", "linkedin": "https://linkedin.com/in/jordandoe"},
+        "work_experience": [{
+            "role": f"Software Engineer {i}",
+            "company": f"Company {i}",
+            "location": "Remote",
+            "from_date": f"Jan {2010 + i}",
+            "to_date": f"Dec {2011 + i}",
+            "description": [f"Built {rng.choice(skills)} services handling {rng.randint(1, 900)}k requests per day." for _ in range(4)],
+        } for i in range(size)],
+        "projects": [{
+            "name": f"Project {i}",
+            "type": "Open source",
+            "link": f"https://github.com/jordandoe/project-{i}",
+            "from_date": f"{2015 + i % 8}",
+            "to_date": f"{2016 + i % 8}",
+            "description": [f"Designed a {rng.choice(skills)} pipeline that cut latency by {rng.randint(5, 80)}%." for _ in range(3)],
+        } for i in range(size)],
+        "skill_section": [{"name": f"Skill group {i}", "skills": rng.sample(skills, 5)} for i in range(max(1, size // 2))],
+        "education": [{"degree": f"Degree {i}", "university": f"University {i}", "from_date": "2008", "to_date": "2012", "grade": "3.8", "courses": ["Algorithms", "Databases"]} for i in range(max(1, size // 4))],
+        "certifications": [{"name": f"Certification {i}", "by": "Issuer", "link": "https://example.com"} for i in range(max(1, size // 2))],
+        "achievements": [f"Award {i} for {rng.choice(skills)} work." for i in range(size)],
+    }
+
+
+def make_job_details(size: int) -> dict:
+    """Builds synthetic job details whose lists grow linearly with `size`."""
+    rng = random.Random(size * 7919)
+    words = ["scalable", "distributed", "python", "cloud", "ml", "data", "api", "latency", "reliability", "kubernetes", "spark", "sql"]
+    return {
+        "job_title": "Senior Software Engineer",
+        "company_name": "Example Corp",
+        "job_purpose": "Build and operate " + " ".join(rng.choice(words) for _ in range(10 * size)) + ".",
+        "keywords": rng.sample(words, min(len(words), 4 + size // 2)),
+        "job_duties_and_responsibilities": [f"Own {rng.choice(words)} {rng.choice(words)} systems." for _ in range(3 * size)],
+        "required_qualifications": [f"{rng.randint(2, 10)}+ years of {rng.choice(words)} experience." for _ in range(2 * size)],
+        "preferred_qualifications": [f"Experience with {rng.choice(words)}." for _ in range(size)],
+    }
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] if ordered else 0.0
+
+
+def summarize(durations: list) -> dict:
+    return {"runs": len(durations), "p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95), "mean": sum(durations) / len(durations) if durations else 0.0}
+
+
+PIPELINE_COMPONENTS = {
+    "pipeline": "AutoApplyModel.resume_cv_pipeline",
+    "job_details": "AutoApplyModel.job_details_extraction",
+    "resume_builder": "AutoApplyModel.resume_builder",
+    "latex_to_pdf": "latex_to_pdf",
+    "cover_letter": "AutoApplyModel.cover_letter_generator",
+    "text_to_pdf": "text_to_pdf",
+    "metrics": "AutoApplyModel.calculate_metrics",
+}
+
+
+def benchmark_pipeline(args):
+    """
+    Runs resume_cv_pipeline end to end with StubLLM over synthetic inputs of increasing size.
+
+    Every run gets fresh download and cache directories, so nothing is served from an earlier
+    run. Component latencies come from the tracing spans each run records. Peak memory is measured in
+    one extra run per size with tracemalloc on, so its overhead does not skew the latencies.
+    """
+    from zlm import AutoApplyModel
+    from zlm.utils.tracing import tracer
+
+    def run_once(profile, job_details):
+        work_dir = tempfile.mkdtemp(prefix="zlm_bench_")
+        try:
+            llm = StubLLM(profile, job_details, latency=args.latency)
+            job_llm = AutoApplyModel(api_key="benchmark", downloads_dir=work_dir, llm=llm, cache_dir=os.path.join(work_dir, ".cache"))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output) if not args.verbose else contextlib.nullcontext():
+                run = job_llm.resume_cv_pipeline(None, user_data=profile, job_site_content=json.dumps(job_details))
+            return run["errors"] if run is not None else {"pipeline": "did not run"}
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {"latency": args.latency, "repeats": args.repeats, "sizes": dict()}
+    for size in args.sizes:
+        profile, job_details = make_profile(size), make_job_details(size)
+        run_once(profile, job_details)  # warm-up: imports, template parsing
+
+        tracer.spans.clear()
+        errors = dict()
+        start_time = time.time()
+        for _ in range(args.repeats):
+            errors.update(run_once(profile, job_details))
+        wall_time = time.time() - start_time
+
+        durations = {component: [] for component in PIPELINE_COMPONENTS}
+        for span in tracer.spans:
+            for component, span_name in PIPELINE_COMPONENTS.items():
+                if span.name == span_name:
+                    durations[component].append(span.duration)
+
+        tracemalloc.start()
+        run_once(profile, job_details)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results["sizes"][str(size)] = {
+            "throughput": args.repeats / wall_time if wall_time else 0.0,
+            "peak_memory_mb": peak_memory / (1024 * 1024),
+            "components": {component: summarize(values) for component, values in durations.items() if values},
+            "errors": errors,
+        }
+
+    print(f"\n{'size':>6}{'component':>16}{'p50 ms':>10}{'p95 ms':>10}")
+    for size, result in results["sizes"].items():
+        for component, stats in result["components"].items():
+            print(f"{size:>6}{component:>16}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}")
+        print(f"{size:>6}{'throughput':>16}  {result['throughput']:.2f} pipelines/s, peak Python memory {result['peak_memory_mb']:.1f} MB")
+        for stage, error in result["errors"].items():
+            print(f"{size:>6}{'error':>16}  {stage}: {error}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            results["regressions"] = compare_results(json.load(file), results, args.tolerance)
+    return results
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float) -> list:
+    """Lists the p95 latencies that are more than `tolerance` (a fraction) slower than in the baseline."""
+    regressions = []
+    print(f"\nComparing with baseline (tolerance {tolerance:.0%})")
+    for size, result in current["sizes"].items():
+        baseline_result = baseline.get("sizes", dict()).get(size)
+        if baseline_result is None:
+            continue
+        for component, stats in result["components"].items():
+            before = baseline_result["components"].get(component, dict()).get("p95")
+            if not before:
+                continue
+            change = stats["p95"] / before - 1
+            if change > tolerance:
+                regressions.append({"size": size, "component": component, "baseline_p95": before, "p95": stats["p95"], "change": change})
+                print(f"REGRESSION size {size} {component}: p95 {before * 1000:.1f} ms -> {stats['p95'] * 1000:.1f} ms ({change:+.0%})")
+    if not regressions:
+        print("No regressions.")
+    return regressions
+
+
+def read_documents(file_path: str, column: str = None) -> list:
+    """Reads benchmark documents: one per row of a CSV column, or one per non-empty line."""
+    if file_path.endswith(".csv"):
+        import csv
+        with open(file_path, newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        column = column or next(iter(rows[0]))
+        return [row[column] for row in rows if row.get(column)]
+    with open(file_path, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def benchmark_normalize(args):
+    """Compares normalize_text tokenizers and stem memoization on the same documents."""
+    from zlm.utils.metrics import TextNormalizer
+
+    if args.file:
+        documents = read_documents(args.file, args.column)[:args.docs]
+    else:
+        documents = [json.dumps(make_profile(1 + i % 8)) for i in range(args.docs)]
+
+    modes = {
+        "nltk, no stem cache": dict(tokenizer="nltk", stem_cache_size=0),
+        "nltk": dict(tokenizer="nltk"),
+        "regex": dict(tokenizer="regex"),
+    }
+    reference = None
+    results = []
+    for name, options in modes.items():
+        normalizer = TextNormalizer(**options)
+        durations = []
+        for _ in range(args.repeats):
+            start_time = time.time()
+            normalized = normalizer.normalize_many(documents)
+            durations.append(time.time() - start_time)
+
+        token_sets = [set(words) for words in normalized]
+        if reference is None:
+            reference = token_sets
+        agreement = sum(len(a & b) / len(a | b) if a | b else 1.0 for a, b in zip(reference, token_sets)) / len(token_sets)
+        cache_info = normalizer.stem.cache_info()
+        lookups = cache_info.hits + cache_info.misses
+        results.append({
+            "mode": name,
+            "docs_per_sec": len(documents) / percentile(durations, 0.5),
+            "p50": percentile(durations, 0.5),
+            "tokens": sum(len(words) for words in normalized),
+            "stem_cache_hit_rate": cache_info.hits / lookups if lookups else 0.0,
+            "agreement": agreement,
+        })
+
+    print(f"\n{len(documents)} documents, {args.repeats} repeats")
+    print(f"{'mode':<22}{'docs/s':>10}{'p50 s':>10}{'stem hits':>11}{'agreement':>11}")
+    for result in results:
+        print(f"{result['mode']:<22}{result['docs_per_sec']:>10.1f}{result['p50']:>10.3f}{result['stem_cache_hit_rate']:>11.1%}{result['agreement']:>11.3f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the resume pipeline.")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backends_parser = subparsers.add_parser("backends", help="Compare text-generation inference backends on the same prompts.")
+    backends_parser.add_argument("-m", "--model", default="deepseek-ai/DeepSeek-V3-0324", help="Model id or local path.")
+    backends_parser.add_argument("-b", "--backends", nargs="+", default=["transformers", "int8", "onnx"], help="Backends to compare.")
+    backends_parser.add_argument("-p", "--prompts", help="File with one prompt per line.")
+    backends_parser.add_argument("-n", "--max_new_tokens", type=int, default=64, help="Tokens generated per prompt.")
+    backends_parser.set_defaults(func=benchmark_backends)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Measure the pipeline's own overhead with a deterministic stub LLM.")
+    pipeline_parser.add_argument("-s", "--sizes", nargs="+", type=int, default=[1, 4, 16], help="Synthetic profile and job description sizes.")
+    pipeline_parser.add_argument("-r", "--repeats", type=int, default=5, help="Runs per size.")
+    pipeline_parser.add_argument("-l", "--latency", type=float, default=0.0, help="Seconds every stub LLM call takes.")
+    pipeline_parser.add_argument("--baseline", help="Results JSON of an earlier run to compare p95 latencies against.")
+    pipeline_parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown against the baseline, as a fraction.")
+    pipeline_parser.add_argument("-v", "--verbose", action="store_true", help="Show the pipeline's own output.")
+    pipeline_parser.set_defaults(func=benchmark_pipeline)
+
+    normalize_parser = subparsers.add_parser("normalize", help="Compare normalize_text tokenizers and stem memoization.")
+    normalize_parser.add_argument("-f", "--file", help="CSV file (see --column) or text file with one document per line. Defaults to synthetic profiles.")
+    normalize_parser.add_argument("-c", "--column", help="CSV column holding the documents. Defaults to the first column.")
+    normalize_parser.add_argument("-n", "--docs", type=int, default=1000, help="Number of documents.")
+    normalize_parser.add_argument("-r", "--repeats", type=int, default=3, help="Passes over the documents per mode.")
+    normalize_parser.set_defaults(func=benchmark_normalize)
+
+    args = parser.parse_args()
+    results = args.func(args)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if isinstance(results, dict) and results.get("regressions"):
+        raise SystemExit(1)
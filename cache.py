@@ -0,0 +1,159 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/cache.py
+Creation Time: Oct 18th 2026, 10:12 am
+-----------------------------------------------------------------------
+'''
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+from zlm.utils.tracing import tracer
+
+
+def make_cache_key(*parts) -> str:
+    """Builds a content-addressed key from the given parts.
+
+    Every part is serialised with sorted keys, so dicts with the same content
+    always produce the same key.
+
+    Returns:
+        str: The SHA-256 hex digest of the serialised parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_default_cache_dir() -> str:
+    cache_dir = os.path.join(str(Path.home()), ".cache", "JobLLM_Resume_CV")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+class ResponseCache:
+    """
+    A disk-backed, size-bounded LRU cache for LLM responses.
+
+    Entries live in a single SQLite file, so the cache is shared by every
+    process (Streamlit sessions, CLI runs, workers) that points at the same
+    directory.
+
+    Args:
+        cache_dir (str, optional): Directory holding the cache database. Defaults to ~/.cache/JobLLM_Resume_CV.
+        name (str, optional): Name of the cache database file. Defaults to "responses".
+        max_bytes (int, optional): Upper bound on the total size of stored values. Defaults to 256 MB.
+        ttl (float, optional): Seconds after which an entry expires. None keeps entries until evicted.
+
+    Methods:
+        get(key: str) -> str: Returns the cached value or None.
+        set(key: str, value: str) -> None: Stores a value and evicts least recently used entries.
+        stats() -> dict: Returns hit/miss counters and current size.
+        clear() -> None: Removes every entry.
+    """
+
+    def __init__(self, cache_dir: str = None, name: str = "responses", max_bytes: int = 256 * 1024 * 1024, ttl: float = None):
+        self.cache_dir = get_default_cache_dir() if cache_dir is None or cache_dir.strip() == "" else cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.name = name
+        self.db_path = os.path.join(self.cache_dir, f"{name}.sqlite3")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                tracer.increment("cache_lookups_total", cache=self.name, result="miss")
+                return None
+
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                tracer.increment("cache_lookups_total", cache=self.name, result="expired")
+                return None
+
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            tracer.increment("cache_lookups_total", cache=self.name, result="hit")
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
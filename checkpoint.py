@@ -0,0 +1,100 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/checkpoint.py
+Creation Time: Oct 19th 2026, 11:15 am
+-----------------------------------------------------------------------
+'''
+import os
+import json
+import time
+import hashlib
+import threading
+
+from zlm.utils.cache import make_cache_key
+
+
+def file_digest(file_path: str) -> str:
+    """Returns the SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RunManifest:
+    """
+    Persists the output of every pipeline stage so a failed run can be resumed.
+
+    Each stage entry records a hash of the stage's inputs, its JSON-serialisable
+    output and the files it produced. An entry is reused only when the inputs
+    hash matches and all of its files still exist, so changed inputs or deleted
+    outputs make the stage run again.
+
+    Args:
+        manifest_path (str): Path of the JSON manifest file.
+
+    Methods:
+        get(stage: str, input_hash: str): Returns the stored output, or None if it is missing or stale.
+        put(stage: str, input_hash: str, output, files: list) -> None: Records a stage output.
+        checkpointed(stage: str, inputs: tuple, func: callable, files: callable, resume: bool): Wraps a stage function.
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                self.stages = json.load(file).get("stages", dict())
+        else:
+            self.stages = dict()
+
+    def get(self, stage: str, input_hash: str):
+        entry = self.stages.get(stage)
+        if entry is None or entry["input_hash"] != input_hash:
+            return None
+        if not all(os.path.exists(file_path) for file_path in entry["files"]):
+            return None
+        return entry["output"]
+
+    def put(self, stage: str, input_hash: str, output, files: list = ()):
+        with self._lock:
+            self.stages[stage] = {
+                "input_hash": input_hash,
+                "output": output,
+                "files": [file_path for file_path in files if file_path],
+                "completed_at": time.time(),
+            }
+            temp_path = f"{self.manifest_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump({"stages": self.stages}, file, indent=2, default=str)
+            os.replace(temp_path, self.manifest_path)
+
+    def checkpointed(self, stage: str, inputs: tuple, func, files=lambda output: [], resume: bool = True):
+        """
+        Wraps a stage function so its output is stored, and reused when `resume` is set.
+
+        Args:
+            stage (str): The stage name.
+            inputs (tuple): Values that identify the stage's own inputs (paths, URLs, model ids).
+            func (callable): The stage function; its keyword arguments (dependency outputs) are hashed too.
+            files (callable, optional): Returns the files produced by an output.
+            resume (bool, optional): Reuse a valid stored output instead of running the stage.
+
+        Returns:
+            callable: The wrapped stage function.
+        """
+        def run(**kwargs):
+            input_hash = make_cache_key(stage, inputs, kwargs)
+            if resume:
+                output = self.get(stage, input_hash)
+                if output is not None:
+                    print(f"Reusing checkpointed output of stage {stage}")
+                    return output
+
+            output = func(**kwargs)
+            self.put(stage, input_hash, output, files(output))
+            return output
+        return run
@@ -0,0 +1,181 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/json_stream.py
+Creation Time: Oct 18th 2026, 3:55 pm
+-----------------------------------------------------------------------
+'''
+import re
+import json
+
+import torch
+from transformers import StoppingCriteria
+
+
+class IncrementalJsonParser:
+    """
+    Parses LLM JSON output in a single pass over token chunks.
+
+    Text before the first `{` or `[` (markdown fences, "typescript"/"json"
+    tags, schema-name preambles) and after the closing bracket is ignored.
+    While scanning, the parser remembers the last offset at which the output
+    can be cut and closed into valid JSON, so `partial()` can return the
+    sections parsed so far, and `close()` repairs truncated output (unclosed
+    strings, arrays and objects) instead of failing.
+
+    Methods:
+        feed(chunk: str) -> None: Consumes the next piece of generated text.
+        partial() -> object: Returns the value parsed so far with open containers closed, or None if nothing new was completed.
+        close() -> object: Returns the final value, repaired if the output was truncated.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.position = 0
+        self.start = None
+        self.end = None
+        self.stack = []  # open containers, "{" or "["
+        self.expect_key = []  # per open container: whether the next string is an object key
+        self.in_string = False
+        self.string_is_key = False
+        self.escaped = False
+        self.safe_cut = None  # (offset, closers) of the last point that can be closed into valid JSON
+        self.partial_cut = None  # safe_cut of the last partial() value
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def _closers(self) -> str:
+        return "".join("}" if bracket == "{" else "]" for bracket in reversed(self.stack))
+
+    def _mark_safe(self, offset: int):
+        self.safe_cut = (offset, self._closers())
+
+    def feed(self, chunk: str):
+        for char in chunk:
+            self.buffer.append(char)
+            self.position += 1
+            if self.end is not None:
+                continue
+
+            if self.start is None:
+                if char in "{[":
+                    self.start = self.position - 1
+                    self.stack.append(char)
+                    self.expect_key.append(char == "{")
+                    self._mark_safe(self.position)
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if not self.string_is_key:
+                        self._mark_safe(self.position)
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_is_key = self.stack[-1] == "{" and self.expect_key[-1]
+            elif char in "{[":
+                self.stack.append(char)
+                self.expect_key.append(char == "{")
+                self._mark_safe(self.position)
+            elif char in "}]":
+                self.stack.pop()
+                self.expect_key.pop()
+                if not self.stack:
+                    self.end = self.position
+                self._mark_safe(self.position)
+            elif char == ",":
+                # Everything before the comma is a complete member
+                self._mark_safe(self.position - 1)
+                if self.stack[-1] == "{":
+                    self.expect_key[-1] = True
+            elif char == ":":
+                self.expect_key[-1] = False
+
+    def _repaired_text(self) -> str:
+        text = "".join(self.buffer)
+        if self.start is None:
+            return None
+        if self.end is not None:
+            return text[self.start:self.end]
+
+        if self.in_string and not self.string_is_key:
+            # Close a truncated string value in place
+            body = text[self.start:]
+            if self.escaped:
+                body = body[:-1]
+            return body + '"' + self._closers()
+
+        offset, closers = self.safe_cut
+        return text[self.start:offset] + closers
+
+    @staticmethod
+    def _loads(text: str):
+        try:
+            return json.loads(text, strict=False)
+        except ValueError:
+            # LLMs often leave trailing commas before a closing bracket
+            return json.loads(re.sub(r",\s*([}\]])", r"\1", text), strict=False)
+
+    def partial(self):
+        # Only re-parse once another member is complete; re-parsing the whole buffer for every token is quadratic
+        if self.safe_cut is None or self.safe_cut == self.partial_cut:
+            return None
+        self.partial_cut = self.safe_cut
+        text = self._repaired_text()
+        if text is None:
+            return None
+        try:
+            return self._loads(text)
+        except ValueError:
+            return None
+
+    def close(self):
+        text = self._repaired_text()
+        if text is None:
+            raise ValueError("No JSON object or array found in the output.")
+        return self._loads(text)
+
+
+class JsonStoppingCriteria(StoppingCriteria):
+    """
+    Stops generation as soon as a complete top-level JSON value has been emitted.
+
+    Each call decodes only the newest token of every sequence and feeds it to
+    an IncrementalJsonParser for that row, so the check stays cheap during generation.
+
+    Args:
+        tokenizer: The tokenizer used to decode generated tokens.
+        max_new_tokens (int): The generation budget, used to report how many tokens were saved.
+    """
+
+    def __init__(self, tokenizer, max_new_tokens: int):
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.scanners = dict()
+        self.generated_tokens = dict()
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = []
+        for row in range(input_ids.shape[0]):
+            scanner = self.scanners.setdefault(row, IncrementalJsonParser())
+            if not scanner.complete:
+                self.generated_tokens[row] = self.generated_tokens.get(row, 0) + 1
+                scanner.feed(self.tokenizer.decode(input_ids[row, -1:], skip_special_tokens=True))
+            done.append(scanner.complete)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    @property
+    def tokens_saved(self) -> int:
+        """Number of tokens not generated thanks to early stopping, summed over sequences."""
+        return sum(
+            self.max_new_tokens - self.generated_tokens.get(row, 0)
+            for row, scanner in self.scanners.items()
+            if scanner.complete
+        )
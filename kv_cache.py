@@ -0,0 +1,113 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/kv_cache.py
+Creation Time: Oct 18th 2026, 2:40 pm
+-----------------------------------------------------------------------
+'''
+import copy
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+from transformers import DynamicCache
+
+from zlm.utils.tracing import tracer, current_span
+
+
+class PrefixKVCache:
+    """
+    Reuses the attention key/value state of a fixed prompt prefix across generations.
+
+    The prefix (typically the system prompt) is run through the model once and
+    its key/value cache is kept. Every generation starts from a copy of that
+    state, so only the tokens after the prefix are prefilled. States are keyed
+    by a hash of the prefix text; a changed system prompt gets a fresh state and
+    the least recently used ones are dropped beyond `max_prefixes`.
+
+    Args:
+        client: A transformers text-generation pipeline.
+        max_prefixes (int, optional): How many distinct prefixes to keep. Defaults to 4.
+
+    Methods:
+        generate(prefix: str, prompt: str, **generate_kwargs) -> str: Generates a completion for prefix + prompt.
+        invalidate(prefix: str = None) -> None: Drops the state of one prefix, or all of them.
+        stats() -> dict: Returns hit/miss counters.
+    """
+
+    def __init__(self, client, max_prefixes: int = 4):
+        self.model = client.model
+        self.tokenizer = client.tokenizer
+        self.max_prefixes = max_prefixes
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def _prefix_state(self, prefix: str):
+        key = self._key(prefix)
+        with self._lock:
+            if key in self._states:
+                self._states.move_to_end(key)
+                self.hits += 1
+                return self._states[key]
+
+            input_ids = self.tokenizer(prefix, return_tensors="pt")["input_ids"].to(self.model.device)
+            with tracer.span("llm.prefix_prefill", prompt_tokens=input_ids.shape[-1]), torch.no_grad():
+                past_key_values = self.model(input_ids=input_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+
+            self._states[key] = (input_ids, past_key_values)
+            self.misses += 1
+            while len(self._states) > self.max_prefixes:
+                self._states.popitem(last=False)
+            return self._states[key]
+
+    def generate(self, prefix: str, prompt: str, **generate_kwargs) -> str:
+        prefix_ids, prefix_cache = self._prefix_state(prefix)
+
+        # Tokenize the suffix separately so the prefix tokens are exactly the cached ones
+        suffix_ids = self.tokenizer(prompt, add_special_tokens=False, return_tensors="pt")["input_ids"].to(self.model.device)
+        input_ids = torch.cat([prefix_ids, suffix_ids], dim=-1)
+
+        span = current_span()
+        if span is not None:
+            # Only the suffix is prefilled here, the prefix tokens come from the cached state
+            span.set("prompt_tokens", suffix_ids.shape[-1])
+            span.set("cached_prefix_tokens", prefix_ids.shape[-1])
+
+        generate_kwargs.pop("return_full_text", None)
+        with torch.no_grad():
+            output_ids = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=copy.deepcopy(prefix_cache),
+                **generate_kwargs,
+            )
+        return self.tokenizer.decode(output_ids[0, input_ids.shape[-1]:], skip_special_tokens=True).strip()
+
+    def invalidate(self, prefix: str = None):
+        with self._lock:
+            if prefix is None:
+                self._states.clear()
+            else:
+                self._states.pop(self._key(prefix), None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "prefixes": len(self._states)}
+
+
+_prefix_caches = weakref.WeakKeyDictionary()
+_prefix_caches_lock = threading.Lock()
+
+
+def get_prefix_cache(client) -> PrefixKVCache:
+    """Returns the prefix cache attached to a pipeline, so every user of a shared pipeline reuses it."""
+    with _prefix_caches_lock:
+        if client not in _prefix_caches:
+            _prefix_caches[client] = PrefixKVCache(client)
+        return _prefix_caches[client]
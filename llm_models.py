@@ -8,46 +8,482 @@ Copyright (c) 2023 Saurabh Zinjad. All rights reserved | GitHub: Ztrimus
 -----------------------------------------------------------------------
 '''
 import json
+import time
+import base64
 import textwrap
-import pandas as pd
+import numpy as np
 import streamlit as st
-from transformers import pipeline
+import torch
+from threading import Thread
+from transformers import StoppingCriteriaList, TextIteratorStreamer
 
+from zlm.utils.backends import supports_prefix_cache
+from zlm.utils.cache import ResponseCache, make_cache_key
+from zlm.utils.json_stream import IncrementalJsonParser, JsonStoppingCriteria
+from zlm.utils.kv_cache import get_prefix_cache
+from zlm.utils.model_registry import ModelRegistry
+from zlm.utils.prompt_packing import PromptPacker, get_context_window, merge_json
+from zlm.utils.tracing import tracer, propagate
+from zlm.utils.transcripts import get_transcript_store
 from zlm.utils.utils import parse_json_markdown
-from zlm.variables import DEEPSEEK_EMBEDDING_MODEL
+from zlm.variables import DEEPSEEK_EMBEDDING_MODEL, DEFAULT_LLM_PROVIDER, LLM_MAPPING, RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL
+from zlm.variables import MODEL_REGISTRY_MAX_BYTES, MODEL_DEVICE, MODEL_TORCH_DTYPE, LLM_MAX_NEW_TOKENS, LLM_MAX_NEW_TOKENS_LONG, LLM_PREFIX_KV_CACHE, EMBEDDING_CACHE_MAX_BYTES
+
+PARTIAL_RESPONSES_REDUCER = """The task below was answered in several parts because its input did not fit in one request.
+Merge the partial answers into one coherent answer. Keep every relevant detail, remove repetition and do not mention the parts.
+
+<partial_answers>
+{partial_responses}
+</partial_answers>
+"""
+
+_response_cache = None
+_embedding_cache = None
+_model_registry = None
+
+def get_model_registry():
+    """Returns the process-wide model registry, creating it on first use."""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry(max_bytes=MODEL_REGISTRY_MAX_BYTES)
+    return _model_registry
+
+def get_response_cache():
+    """Returns the process-wide response cache, creating it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(RESPONSE_CACHE_DIR, name="responses", max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL)
+    return _response_cache
+
+def get_embedding_cache():
+    """Returns the process-wide embedding cache, creating it on first use."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = ResponseCache(RESPONSE_CACHE_DIR, name="embeddings", max_bytes=EMBEDDING_CACHE_MAX_BYTES)
+    return _embedding_cache
 
 class DeepSeekModel:
-    def __init__(self, api_key, system_prompt):
+    def __init__(self, api_key, system_prompt, model=DEEPSEEK_EMBEDDING_MODEL, use_cache=True, device=MODEL_DEVICE, torch_dtype=MODEL_TORCH_DTYPE, use_prefix_cache=LLM_PREFIX_KV_CACHE, backend=LLM_MAPPING[DEFAULT_LLM_PROVIDER]["backend"]):
         self.system_prompt = system_prompt
-        self.client = pipeline("text-generation", model="deepseek-ai/DeepSeek-V3-0324", api_key=api_key, trust_remote_code=True)
+        self.model = model
+        self.backend = backend
+        self.transcripts = get_transcript_store()
+        # Recordings should hold real generation latencies and replays should not hit anything else
+        use_cache = use_cache and not (self.transcripts.recording or self.transcripts.replaying)
+        self.cache = get_response_cache() if use_cache else None
+        self.embedding_cache = get_embedding_cache() if use_cache else None
+        self.use_prefix_cache = use_prefix_cache and supports_prefix_cache(self.backend)
+        if self.transcripts.replaying:
+            # Responses come from the transcript, so the model is never loaded
+            self._pipeline_kwargs = None
+            self.context_window = None
+        else:
+            self._pipeline_key = dict(task="text-generation", device=device, torch_dtype=torch_dtype, backend=self.backend)
+            self._pipeline_kwargs = dict(self._pipeline_key, api_key=api_key, trust_remote_code=True)
+            # Acquiring the model is what counts as a registry hit; later lookups only peek
+            self.context_window = get_context_window(get_model_registry().get_pipeline(self.model, **self._pipeline_kwargs))
+        self.json_tokens_saved = 0
+
+    @property
+    def client(self):
+        """The model's pipeline, looked up in the registry on every use so an evicted model is not kept loaded by this instance."""
+        if self._pipeline_kwargs is None:
+            return None
+        registry = get_model_registry()
+        # Reloads the model if it was evicted since this instance last used it
+        client = registry.peek(self.model, **self._pipeline_key)
+        return client if client is not None else registry.get_pipeline(self.model, **self._pipeline_kwargs)
+
+    @property
+    def prefix_cache(self):
+        # Attached to the pipeline weakly, so it is released together with evicted weights
+        return get_prefix_cache(self.client) if self.use_prefix_cache and self._pipeline_kwargs is not None else None
     
-    def get_response(self, prompt, expecting_longer_output=False, need_json_output=False):
-        user_prompt = f"{self.system_prompt}\n{prompt}"
-        chunk_size = 1024  # Define your chunk size
-        responses = []
+    def _generation_params(self, expecting_longer_output=False, clamp=True):
+        max_new_tokens = LLM_MAX_NEW_TOKENS_LONG if expecting_longer_output else LLM_MAX_NEW_TOKENS
+        if clamp and self.context_window is not None:
+            # On small-context models the output budget would leave no room for the prompt, keep half the window for it
+            max_new_tokens = min(max_new_tokens, self.context_window // 2)
+        return {"max_new_tokens": max_new_tokens, "return_full_text": False}
 
-        try:
-            for i in range(0, len(user_prompt), chunk_size):
-                chunk = user_prompt[i:i + chunk_size]
-                completion = self.client(chunk, max_length=4000 if expecting_longer_output else None, return_full_text=False)
-                content = completion[0]['generated_text'].strip()
-                responses.append(content)
-            
-            full_response = " ".join(responses)
-            
-            if need_json_output:
-                return parse_json_markdown(full_response)
+    def _transcript_key(self, prompt, expecting_longer_output, need_json_output):
+        # Unclamped, since replay runs without a loaded model to read the context window from
+        return make_cache_key(self.model, self.system_prompt, prompt, self._generation_params(expecting_longer_output, clamp=False), need_json_output)
+
+    def _count_tokens(self, text):
+        return len(self.client.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def _generate(self, prompt, generation_params, **generate_kwargs):
+        """Generates a completion for the system prompt followed by `prompt`."""
+        with tracer.span("llm.generate", model=self.model, backend=self.backend) as span:
+            if self.prefix_cache is not None:
+                # Only the tokens after the system prompt are prefilled; its key/value state is reused
+                response = self.prefix_cache.generate(f"{self.system_prompt}\n", prompt, **generation_params, **generate_kwargs)
             else:
-                return full_response
+                span.set("prompt_tokens", self._count_tokens(f"{self.system_prompt}\n{prompt}"))
+                completion = self.client(f"{self.system_prompt}\n{prompt}", **generation_params, **generate_kwargs)
+                response = completion[0]['generated_text'].strip()
+            span.set("response_tokens", self._count_tokens(response))
+            return response
+
+    def _generate_json(self, prompt, generation_params, **generate_kwargs):
+        """Generates a JSON completion, stopping as soon as the top-level value is closed."""
+        criteria = JsonStoppingCriteria(self.client.tokenizer, generation_params["max_new_tokens"])
+        response = self._generate(prompt, generation_params, stopping_criteria=StoppingCriteriaList([criteria]), **generate_kwargs)
+        self._report_tokens_saved(criteria)
+        return response
+
+    def _report_tokens_saved(self, criteria):
+        if criteria.tokens_saved:
+            self.json_tokens_saved += criteria.tokens_saved
+            tracer.increment("json_early_stop_tokens_saved_total", criteria.tokens_saved)
+            print(f"JSON output complete early, saved {criteria.tokens_saved} of {criteria.max_new_tokens * len(criteria.scanners)} tokens")
+
+    def get_response(self, prompt, expecting_longer_output=False, need_json_output=False, bypass_cache=False, return_complete=False):
+        """
+        Generates a response for `prompt`, packing it into context-sized chunks when it is too long.
+
+        Args:
+            prompt (str): The prompt to answer.
+            expecting_longer_output (bool, optional): Allow LLM_MAX_NEW_TOKENS_LONG tokens in the completion.
+            need_json_output (bool, optional): Parse the response with parse_json_markdown.
+            bypass_cache (bool, optional): Skip the response cache for lookups and writes.
+            return_complete (bool, optional): With need_json_output, return a (value, complete) tuple,
+                complete being False when truncated JSON had to be repaired.
+        """
+        generation_params = self._generation_params(expecting_longer_output)
+
+        with tracer.span("llm.get_response", model=self.model, json_output=need_json_output) as span:
+            try:
+                use_cache = self.cache is not None and not bypass_cache
+                if use_cache:
+                    cache_key = make_cache_key(self.model, self.backend, self.system_prompt, prompt, generation_params, need_json_output)
+                    full_response = self.cache.get(cache_key)
+                else:
+                    full_response = None
+                cache_hit = full_response is not None
+                span.set("cache_hit", cache_hit)
+                truncated_chunks = []
+
+                if full_response is None:
+                    def generate_full_response():
+                        packer = PromptPacker(self.client.tokenizer, self.context_window)
+                        chunks = packer.pack(prompt, self.system_prompt, generation_params["max_new_tokens"])
+                        span.set("chunks", len(chunks))
+                        generate = self._generate_json if need_json_output else self._generate
+                        responses = [generate(chunk, generation_params) for chunk in chunks]
+
+                        if len(responses) == 1:
+                            full_response = responses[0]
+                        elif need_json_output:
+                            # Map/reduce: every chunk answered the same instructions over part of the data
+                            merged = None
+                            for response in responses:
+                                value, complete = parse_json_markdown(response, return_complete=True)
+                                if not complete:
+                                    truncated_chunks.append(response)
+                                merged = merge_json(merged, value)
+                            full_response = json.dumps(merged)
+                        else:
+                            reduce_prompt = PARTIAL_RESPONSES_REDUCER.format(partial_responses="\n\n---\n\n".join(responses))
+                            if packer.count(reduce_prompt) <= packer.context_window - generation_params["max_new_tokens"] - packer.count(self.system_prompt):
+                                full_response = self._generate(reduce_prompt, generation_params)
+                            else:
+                                full_response = "\n\n".join(responses)
+                        return full_response
+
+                    full_response = self.transcripts.replay_or_record(
+                        self._transcript_key(prompt, expecting_longer_output, need_json_output), prompt, generate_full_response, model=self.model,
+                    )
+
+                if need_json_output:
+                    response, complete = parse_json_markdown(full_response, return_complete=True)
+                    complete = complete and not truncated_chunks
+                else:
+                    response, complete = full_response, True
+
+                # Truncated JSON is repaired for this call but never cached, so a later call generates it again
+                if use_cache and not cache_hit and complete:
+                    self.cache.set(cache_key, full_response)
+
+                return (response, complete) if need_json_output and return_complete else response
         
-        except Exception as e:
-            print(e)
-            st.error(f"Error in Hugging Face API, {e}")
-            st.markdown("<h3 style='text-align: center;'>Please try again! Check the log in the dropdown for more details.</h3>", unsafe_allow_html=True)
+            except Exception as e:
+                span.record_error(e)
+                print(e)
+                st.error(f"Error in Hugging Face API, {e}")
+                st.markdown("<h3 style='text-align: center;'>Please try again! Check the log in the dropdown for more details.</h3>", unsafe_allow_html=True)
     
-    def get_embedding(self, text, model=DEEPSEEK_EMBEDDING_MODEL, task_type="retrieval_document"):
+    def stream_response(self, prompt, expecting_longer_output=False, bypass_cache=False, need_json_output=False):
+        """
+        Yields the completion text piece by piece while the model is still generating.
+
+        The whole prompt is sent in one generation call and decoded tokens are forwarded as soon as
+        the streamer receives them. Cached responses, and prompts too long for one call (answered by
+        the packed get_response path instead), are yielded in a single piece. A failed generation
+        is raised from the generator once streaming stops, so callers never mistake partial text for
+        a complete response.
+
+        Args:
+            prompt (str): The prompt to answer.
+            expecting_longer_output (bool, optional): Allow LLM_MAX_NEW_TOKENS_LONG tokens in the completion.
+            bypass_cache (bool, optional): Skip the response cache for lookups and writes.
+            need_json_output (bool, optional): Stop as soon as a complete JSON value has been generated.
+
+        Yields:
+            str: The next piece of generated text.
+
+        Raises:
+            LookupError: In transcript replay mode, if the prompt was not recorded.
+            Exception: Any error raised while generating.
+        """
+        generation_params = dict(self._generation_params(expecting_longer_output), streamed=True)
+        use_cache = self.cache is not None and not bypass_cache
+        cache_key = make_cache_key(self.model, self.backend, self.system_prompt, prompt, generation_params, need_json_output)
+
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        transcript_key = self._transcript_key(prompt, expecting_longer_output, need_json_output)
+        if self.transcripts.replaying:
+            yield from self.transcripts.replay_stream(transcript_key)
+            return
+
+        packer = PromptPacker(self.client.tokenizer, self.context_window)
+        if packer.count(self.system_prompt) + packer.count(prompt) + 1 > self.context_window - generation_params["max_new_tokens"]:
+            # Streaming cannot split the prompt, so answer it with the packed path instead of overflowing the context
+            response = self.get_response(prompt, expecting_longer_output, need_json_output, bypass_cache)
+            if response is None:
+                raise ValueError("Unable to generate a response for a prompt longer than the context window.")
+            yield json.dumps(response) if need_json_output else response
+            return
+
+        start_time = time.time()
+        streamer = TextIteratorStreamer(self.client.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def generate():
+            try:
+                if need_json_output:
+                    self._generate_json(prompt, self._generation_params(expecting_longer_output), streamer=streamer)
+                else:
+                    self._generate(prompt, self._generation_params(expecting_longer_output), streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        worker = Thread(target=propagate(generate), daemon=True)
+        worker.start()
+
+        pieces = []
+        for text in streamer:
+            if text:
+                pieces.append(text)
+                yield text
+        worker.join()
+
+        if errors:
+            raise errors[0]
+
+        if self.transcripts.recording:
+            self.transcripts.record(transcript_key, prompt, "".join(pieces).strip(), time.time() - start_time, model=self.model)
+        # Like get_response, JSON cut off at max_new_tokens is not cached
+        if use_cache and (not need_json_output or parse_json_markdown("".join(pieces), return_complete=True)[1]):
+            self.cache.set(cache_key, "".join(pieces).strip())
+
+    def stream_json_response(self, prompt, expecting_longer_output=False, bypass_cache=False, return_complete=False):
+        """
+        Yields the partially parsed JSON value while the model is still generating it.
+
+        Args:
+            prompt (str): The prompt to answer.
+            expecting_longer_output (bool, optional): Allow LLM_MAX_NEW_TOKENS_LONG tokens in the completion.
+            bypass_cache (bool, optional): Skip the response cache for lookups and writes.
+            return_complete (bool, optional): Yield (value, complete) tuples; complete is only True for
+                a last value the model closed itself, not one repaired after truncation.
+
+        Yields:
+            dict: The value parsed so far, with unfinished strings, arrays and objects closed.
+                The last value yielded is the complete (or repaired) response.
+        """
+        parser = IncrementalJsonParser()
+        for text in self.stream_response(prompt, expecting_longer_output, bypass_cache, need_json_output=True):
+            parser.feed(text)
+            partial = parser.partial()
+            if partial is not None:
+                yield (partial, False) if return_complete else partial
+
+        try:
+            value = parser.close()
+        except ValueError as e:
+            print(e)
+            return
+        yield (value, parser.complete) if return_complete else value
+
+    def get_responses(self, prompts, expecting_longer_output=False, need_json_output=False, batch_size=8, max_batch_tokens=8192, bypass_cache=False):
+        """
+        Generates responses for many prompts by packing them into padded batches.
+
+        Prompts are sorted by token length so each batch carries little padding, and a batch is
+        closed once it holds `batch_size` prompts or its padded size would exceed `max_batch_tokens`.
+        Unlike get_response, each prompt is sent whole and is not packed into context-sized chunks.
+
+        Args:
+            prompts (list): The prompts to answer.
+            expecting_longer_output (bool, optional): Allow LLM_MAX_NEW_TOKENS_LONG tokens per completion.
+            need_json_output (bool, optional): Parse every response with parse_json_markdown.
+            batch_size (int, optional): Maximum number of prompts per pipeline call.
+            max_batch_tokens (int, optional): Maximum padded prompt tokens (longest prompt * batch length) per call.
+            bypass_cache (bool, optional): Skip the response cache for lookups and writes.
+
+        Returns:
+            list: One entry per prompt, in input order. Failed prompts hold the raised Exception instead of a response.
+        """
+        if self.transcripts.replaying:
+            results = []
+            for prompt in prompts:
+                try:
+                    results.append(self.transcripts.replay(self._transcript_key(prompt, expecting_longer_output, need_json_output)))
+                except LookupError as e:
+                    results.append(e)
+            return self._parse_results(results) if need_json_output else results
+
+        generation_params = dict(self._generation_params(expecting_longer_output), batched=True)
+        use_cache = self.cache is not None and not bypass_cache
+        results = [None] * len(prompts)
+        pending = []
+
+        for index, prompt in enumerate(prompts):
+            cached = None
+            if use_cache:
+                cached = self.cache.get(make_cache_key(self.model, self.backend, self.system_prompt, prompt, generation_params, need_json_output))
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append(index)
+
+        user_prompts = {index: f"{self.system_prompt}\n{prompts[index]}" for index in pending}
+        tokenizer = self.client.tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = "left"  # decoder-only models continue from the right edge
+        lengths = {index: len(tokenizer(user_prompts[index])["input_ids"]) for index in pending}
+
+        batches, batch = [], []
+        for index in sorted(pending, key=lengths.get):
+            padded_tokens = max([lengths[i] for i in batch] + [lengths[index]]) * (len(batch) + 1)
+            if batch and (len(batch) >= batch_size or padded_tokens > max_batch_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+        if batch:
+            batches.append(batch)
+
+        for batch in batches:
+            batch_start = time.time()
+            try:
+                batch_kwargs = dict(self._generation_params(expecting_longer_output))
+                if need_json_output:
+                    criteria = JsonStoppingCriteria(tokenizer, batch_kwargs["max_new_tokens"])
+                    batch_kwargs["stopping_criteria"] = StoppingCriteriaList([criteria])
+                with tracer.span("llm.generate_batch", model=self.model, prompts=len(batch), prompt_tokens=sum(lengths[i] for i in batch)) as span:
+                    completions = self.client([user_prompts[i] for i in batch], batch_size=len(batch), **batch_kwargs)
+                    outputs = [completion[0]['generated_text'].strip() for completion in completions]
+                    span.set("response_tokens", sum(self._count_tokens(output) for output in outputs))
+                if need_json_output:
+                    self._report_tokens_saved(criteria)
+            except Exception as e:
+                print(f"Batch of {len(batch)} prompts failed, retrying one by one: {e}")
+                outputs = []
+                for i in batch:
+                    try:
+                        generate = self._generate_json if need_json_output else self._generate
+                        outputs.append(generate(prompts[i], self._generation_params(expecting_longer_output)))
+                    except Exception as item_error:
+                        outputs.append(item_error)
+
+            for i, output in zip(batch, outputs):
+                results[i] = output
+                if self.transcripts.recording and not isinstance(output, Exception):
+                    # Batch members share one latency, split evenly so replayed totals match
+                    self.transcripts.record(self._transcript_key(prompts[i], expecting_longer_output, need_json_output), prompts[i], output,
+                                            (time.time() - batch_start) / len(batch), model=self.model)
+                if use_cache and not isinstance(output, Exception):
+                    self.cache.set(make_cache_key(self.model, self.backend, self.system_prompt, prompts[i], generation_params, need_json_output), output)
+
+        return self._parse_results(results) if need_json_output else results
+
+    @staticmethod
+    def _parse_results(results):
+        parsed_results = []
+        for result in results:
+            if isinstance(result, Exception):
+                parsed_results.append(result)
+                continue
+            parsed = parse_json_markdown(result)
+            parsed_results.append(parsed if parsed is not None else ValueError(f"Unable to parse JSON from response: {result[:200]}"))
+        return parsed_results
+
+    def get_embeddings(self, texts, batch_size=32):
+        """
+        Embeds many texts in batches, serving repeats from the on-disk embedding cache.
+
+        Texts are deduplicated first, so every distinct text is embedded at most once. An embedding
+        is the attention-masked mean of the last hidden state of this instance's model, and cached
+        vectors are keyed on that model and backend, so models of different widths never share them.
+
+        Args:
+            texts (list): The texts to embed.
+            batch_size (int, optional): Number of texts per forward pass.
+
+        Returns:
+            np.ndarray: A contiguous float32 matrix with one row per input text, in input order.
+        """
+        texts = [text.replace("\n", " ") for text in texts]
+        unique_texts = list(dict.fromkeys(texts))
+        embeddings = dict()
+        missing = []
+
+        for text in unique_texts:
+            cached = self.embedding_cache.get(make_cache_key(self.model, self.backend, text)) if self.embedding_cache is not None else None
+            if cached is not None:
+                embeddings[text] = np.frombuffer(base64.b64decode(cached), dtype=np.float32)
+            else:
+                missing.append(text)
+
+        client = self.client if missing else None
+        if missing:
+            if client is None:
+                raise RuntimeError("Embeddings need a loaded model, but none is loaded while replaying LLM transcripts (LLM_TRANSCRIPT_MODE=replay).")
+            if not isinstance(client.model, torch.nn.Module):
+                raise RuntimeError(f"Embeddings need hidden states from a torch model, which the '{self.backend}' backend does not provide. Use the transformers or int8 backend.")
+
+            tokenizer = client.tokenizer
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            inputs = tokenizer(batch, padding=True, truncation=True, return_tensors="pt").to(client.model.device)
+            with tracer.span("llm.embed_batch", model=self.model, texts=len(batch), prompt_tokens=int(inputs["attention_mask"].sum())), torch.no_grad():
+                hidden_states = client.model(**inputs, output_hidden_states=True).hidden_states[-1]
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden_states.dtype)
+            pooled = ((hidden_states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)).float().cpu().numpy()
+
+            for text, embedding in zip(batch, pooled):
+                embeddings[text] = embedding.astype(np.float32)
+                if self.embedding_cache is not None:
+                    self.embedding_cache.set(make_cache_key(self.model, self.backend, text), base64.b64encode(embeddings[text].tobytes()).decode("ascii"))
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.stack([embeddings[text] for text in texts]), dtype=np.float32)
+
+    def get_embedding(self, text):
         try:
-            text = text.replace("\n", " ")
-            return self.client.embeddings.create(input = [text], model=model).data[0].embedding
+            return self.get_embeddings([text])[0].tolist()
         except Exception as e:
             print(e)
@@ -0,0 +1,194 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/lsh.py
+Creation Time: Oct 20th 2026, 10:05 am
+-----------------------------------------------------------------------
+'''
+import hashlib
+import functools
+from collections import defaultdict
+
+import joblib
+import numpy as np
+
+from zlm.utils.metrics import get_normalizer
+from zlm.utils.tracing import traced
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+@functools.lru_cache(maxsize=200000)
+def _token_hash(token: str) -> int:
+    # A stable 32-bit hash; Python's hash() changes between processes, which would break saved indexes
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def optimal_bands(threshold: float, num_perm: int) -> tuple:
+    """Returns the (bands, rows) split of num_perm whose LSH S-curve crosses 50% closest to threshold."""
+    splits = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(splits, key=lambda split: abs((1 / split[0]) ** (1 / split[1]) - threshold))
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of token sets.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two sets. The permutations are seeded, so signatures are
+    comparable across processes and can be stored.
+
+    Args:
+        num_perm (int, optional): Signature length. Defaults to 128.
+        seed (int, optional): Seed of the hash permutations. Defaults to 1.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens) -> np.ndarray:
+        if not tokens:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter((_token_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+        # Universal hashing (a * x + b) mod p for every token and permutation at once; uint64 overflow wraps as intended
+        permuted = ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def estimate_jaccard(signature1: np.ndarray, signature2: np.ndarray) -> float:
+        return float(np.mean(signature1 == signature2))
+
+
+class LSHIndex:
+    """
+    A MinHash LSH index that finds stored documents whose normalized token sets are similar to a query.
+
+    Every document is reduced to the set of words normalize_text produces, and its MinHash signature
+    is split into bands. Documents sharing at least one identical band with the query are
+    candidates, which costs a few dictionary lookups instead of a set intersection per stored
+    document. Candidates are then re-scored exactly, so the results never contain false positives;
+    documents just above the threshold may occasionally be missed.
+
+    Args:
+        threshold (float, optional): Jaccard similarity the band layout is tuned for and queries filter on. Defaults to 0.5.
+        num_perm (int, optional): MinHash signature length. Defaults to 128.
+        tokenizer (str, optional): TextNormalizer tokenizer, "nltk" or "regex". Defaults to "nltk".
+
+    Methods:
+        add(key: str, document: str) -> None: Indexes a document under key.
+        add_many(documents: dict) -> None: Indexes key -> document pairs.
+        remove(key: str) -> None: Drops a document.
+        query(document: str, threshold: float, top_k: int) -> list: Returns (key, jaccard, overlap) of similar documents.
+        save(path: str) -> None / load(path: str) -> LSHIndex: Persists the index with joblib.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128, tokenizer: str = "nltk"):
+        self.threshold = threshold
+        self.tokenizer = tokenizer
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.token_sets = dict()
+        self.signatures = dict()
+        self.buckets = [defaultdict(set) for _ in range(self.bands)]
+
+    def __len__(self):
+        return len(self.token_sets)
+
+    def _tokens(self, document: str) -> frozenset:
+        return frozenset(get_normalizer(self.tokenizer).normalize(document))
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, document: str = None, tokens=None):
+        if key in self.token_sets:
+            self.remove(key)
+        tokens = frozenset(tokens) if tokens is not None else self._tokens(document)
+        if not tokens:
+            return
+        signature = self.hasher.signature(tokens)
+        self.token_sets[key] = tokens
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band][band_key].add(key)
+
+    @traced("lsh.add_many")
+    def add_many(self, documents: dict):
+        for key, document in documents.items():
+            self.add(key, document)
+
+    def remove(self, key: str):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        del self.token_sets[key]
+        for band, band_key in self._band_keys(signature):
+            bucket = self.buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band][band_key]
+
+    def candidates(self, tokens) -> set:
+        signature = self.hasher.signature(frozenset(tokens))
+        found = set()
+        for band, band_key in self._band_keys(signature):
+            found.update(self.buckets[band].get(band_key, ()))
+        return found
+
+    @traced("lsh.query")
+    def query(self, document: str = None, threshold: float = None, top_k: int = None, tokens=None) -> list:
+        """
+        Finds stored documents whose Jaccard similarity with the query is at least threshold.
+
+        Args:
+            document (str, optional): The query text, normalized like the stored documents.
+            threshold (float, optional): Minimum exact Jaccard similarity. Defaults to the index threshold.
+            top_k (int, optional): Keep only the most similar results.
+            tokens (iterable, optional): Already normalized query tokens, instead of document.
+
+        Returns:
+            list: (key, jaccard_similarity, overlap_coefficient) tuples, most similar first.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        query_tokens = frozenset(tokens) if tokens is not None else self._tokens(document)
+        if not query_tokens:
+            return []
+
+        results = []
+        for key in self.candidates(query_tokens):
+            stored_tokens = self.token_sets[key]
+            intersection = len(query_tokens & stored_tokens)
+            jaccard = intersection / (len(query_tokens) + len(stored_tokens) - intersection)
+            if jaccard >= threshold:
+                results.append((key, jaccard, intersection / min(len(query_tokens), len(stored_tokens))))
+
+        results.sort(key=lambda result: result[1], reverse=True)
+        return results[:top_k] if top_k is not None else results
+
+    def save(self, path: str):
+        joblib.dump({
+            "threshold": self.threshold,
+            "tokenizer": self.tokenizer,
+            "num_perm": self.hasher.num_perm,
+            "seed": self.hasher.seed,
+            "token_sets": self.token_sets,
+            "signatures": self.signatures,
+        }, path)
+
+    @classmethod
+    def load(cls, path: str):
+        saved = joblib.load(path)
+        index = cls(saved["threshold"], saved["num_perm"], saved["tokenizer"])
+        index.hasher = MinHasher(saved["num_perm"], saved["seed"])
+        for key, tokens in saved["token_sets"].items():
+            index.token_sets[key] = tokens
+            index.signatures[key] = saved["signatures"][key]
+            for band, band_key in index._band_keys(index.signatures[key]):
+                index.buckets[band][band_key].add(key)
+        return index
@@ -10,10 +10,15 @@ Copyright (c) 2023 Saurabh Zinjad. All rights reserved | GitHub: Ztrimus
 
 import argparse
 from zlm import AutoApplyModel
+from zlm.utils.cache import make_cache_key
+from zlm.utils.tracing import tracer
 import os
 import json
+import time
+import validators
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def create_resume_cv(url, master_data_path, api_key, downloads_dir):
+def create_resume_cv(url, master_data_path, api_key, downloads_dir, resume_from_checkpoint=False):
     """
     Creates a resume or CV using the Job-LLM model.
 
@@ -22,22 +27,126 @@ def create_resume_cv(url, master_data_path, api_key, downloads_dir):
         master_data_path (str): The path to the master data file containing information about the candidate.
         api_key (str): The API key for Hugging Face.
         downloads_dir (str): The directory where the generated resume or CV will be saved.
+        resume_from_checkpoint (bool): Reuse the stages a previous run for the same inputs already completed.
 
     Returns:
         None
     """
-    # Load master data from file
-    with open(master_data_path, 'r') as file:
-        master_data = json.load(file)
-
     # Initialize the model with Hugging Face's DeepSeek-V3-0324
-    job_llm = AutoApplyModel(api_key, downloads_dir, "deepseek-ai/DeepSeek-V3-0324")
+    job_llm = AutoApplyModel(api_key=api_key, model="deepseek-ai/DeepSeek-V3-0324", downloads_dir=downloads_dir)
+
+    job_llm.resume_cv_pipeline(url, master_data_path, resume_from_checkpoint=resume_from_checkpoint)
 
-    # Send data in chunks
-    chunk_size = 1024  # Define your chunk size
-    for i in range(0, len(master_data), chunk_size):
-        chunk = master_data[i:i + chunk_size]
-        job_llm.resume_cv_pipeline(url, chunk)
+def read_jobs(jobs_path):
+    """
+    Reads the jobs to apply for from a file.
+
+    A .json file holds a list and a .jsonl file one entry per line; each entry is a URL string, a job
+    description string, or an object with a "url" or "text" key. Any other file has one job URL per line.
+
+    Args:
+        jobs_path (str): The path to the jobs file.
+
+    Returns:
+        list: One {"url": ...} or {"text": ...} dict per job.
+    """
+    with open(jobs_path) as file:
+        if jobs_path.endswith(".json"):
+            entries = json.load(file)
+        elif jobs_path.endswith(".jsonl"):
+            entries = [json.loads(line) for line in file if line.strip()]
+        else:
+            entries = [line.strip() for line in file if line.strip() and not line.strip().startswith("#")]
+
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            jobs.append({"url": entry["url"]} if entry.get("url") else {"text": entry["text"]})
+        elif validators.url(entry):
+            jobs.append({"url": entry})
+        else:
+            jobs.append({"text": entry})
+    return jobs
+
+def create_resume_cv_batch(jobs_path, master_data_path, api_key, downloads_dir, workers=4, resume_from_checkpoint=False, manifest_path=None):
+    """
+    Creates tailored resumes and cover letters for many jobs with a bounded worker pool.
+
+    The candidate profile is extracted once and every worker shares the same model, so loaded weights,
+    response caches and the system prompt's KV state are reused across jobs. Each job writes its files to
+    its own subdirectory of downloads_dir, named after a hash of the job, so postings with the same company
+    and title never overwrite each other's outputs.
+
+    Args:
+        jobs_path (str): The path to the file listing job URLs or job descriptions, see read_jobs.
+        master_data_path (str): The path to the master data file containing information about the candidate.
+        api_key (str): The API key for Hugging Face.
+        downloads_dir (str): The directory where the generated resumes and CVs will be saved.
+        workers (int): Number of jobs processed concurrently.
+        resume_from_checkpoint (bool): Reuse the stages previous runs for the same inputs already completed.
+        manifest_path (str): Where to write the results manifest. Defaults to batch_results_<timestamp>.json in downloads_dir.
+
+    Returns:
+        list: The per-job results written to the manifest.
+    """
+    jobs = read_jobs(jobs_path)
+    job_llm = AutoApplyModel(api_key=api_key, model="deepseek-ai/DeepSeek-V3-0324", downloads_dir=downloads_dir)
+    user_data = job_llm.user_data_extraction(master_data_path)
+
+    job_dirs = []
+    for index, job in enumerate(jobs):
+        job_dir = make_cache_key(job.get("url") or job["text"])[:12]
+        # The same job listed twice still gets separate outputs
+        job_dirs.append(job_dir if job_dir not in job_dirs else f"{job_dir}_{index}")
+
+    def run_job(index, job):
+        start_time = time.time()
+        try:
+            job_output_dir = os.path.join(job_llm.downloads_dir, job_dirs[index])
+            os.makedirs(job_output_dir, exist_ok=True)
+            job_model = AutoApplyModel(api_key=api_key, model=job_llm.model, downloads_dir=job_output_dir, llm=job_llm.llm)
+            run = job_model.resume_cv_pipeline(job.get("url"), master_data_path, resume_from_checkpoint=resume_from_checkpoint,
+                                             user_data=user_data, job_site_content=job.get("text"))
+            if run is None:
+                raise Exception("Pipeline did not run.")
+            stages = run["stages"]
+            return {
+                "status": "failed" if run["errors"] else "ok",
+                "resume_path": stages["resume"][0] if "resume" in stages else None,
+                "cv_path": stages["cover_letter"][1] if "cover_letter" in stages else None,
+                "metrics": stages.get("metrics"),
+                "errors": run["errors"],
+                "stage_timings": run["timings"],
+                "wall_time": time.time() - start_time,
+            }
+        except Exception as e:
+            return {"status": "failed", "errors": {"pipeline": str(e)}, "wall_time": time.time() - start_time}
+
+    batch_start = time.time()
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, index, job): index for index, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            results[index] = dict(jobs[index], output_dir=os.path.join(job_llm.downloads_dir, job_dirs[index]), **future.result())
+            failed = sum(1 for result in results if result is not None and result["status"] == "failed")
+            print(f"[{done}/{len(jobs)}] {results[index]['status']} in {results[index]['wall_time']:.1f}s: "
+                  f"{jobs[index].get('url') or jobs[index]['text'][:60]} ({failed} failed so far)")
+
+    if manifest_path is None:
+        manifest_path = os.path.join(job_llm.downloads_dir, f"batch_results_{int(batch_start)}.json")
+    with open(manifest_path, "w") as file:
+        json.dump({
+            "jobs_file": jobs_path,
+            "master_data": master_data_path,
+            "workers": workers,
+            "wall_time": time.time() - batch_start,
+            "succeeded": sum(1 for result in results if result["status"] == "ok"),
+            "failed": sum(1 for result in results if result["status"] == "failed"),
+            "results": results,
+        }, file, indent=2, default=str)
+    print(f"\nBatch results manifest written to {manifest_path}")
+    return results
 
 
 if __name__ == "__main__":
@@ -46,13 +155,30 @@ if __name__ == "__main__":
 
     # Add the required arguments
     parser.add_argument("-u", "--url", help="URL of the job posting")
+    parser.add_argument("-b", "--batch", help="File of job URLs or job descriptions to apply for in one run.")
     parser.add_argument("-m", "--master_data", help="Path of user's master data file.")
     parser.add_argument("-k", "--api_key", default="os", help="LLM Provider API Keys")
     parser.add_argument("-d", "--downloads_dir", help="Give detailed path of folder")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Number of jobs processed concurrently in batch mode.")
+    parser.add_argument("-r", "--resume", action="store_true", help="Skip pipeline stages already completed for the same inputs.")
+    parser.add_argument("--manifest", help="Path of the batch results manifest.")
+    parser.add_argument("--trace", help="Write the recorded tracing spans to this JSON lines file.")
+    parser.add_argument("--trace_metrics", help="Write the aggregated metrics in Prometheus text format to this file.")
 
     # Parse the arguments
     args = parser.parse_args()
 
-    create_resume_cv(
-        args.url, args.master_data, args.api_key, args.downloads_dir
-    )
\ No newline at end of file
+    if args.batch:
+        create_resume_cv_batch(
+            args.batch, args.master_data, args.api_key, args.downloads_dir, args.workers, args.resume, args.manifest
+        )
+    else:
+        create_resume_cv(
+            args.url, args.master_data, args.api_key, args.downloads_dir, args.resume
+        )
+
+    if args.trace:
+        print(f"{tracer.export_jsonl(args.trace)} spans written to {args.trace}")
+    if args.trace_metrics:
+        with open(args.trace_metrics, "w") as file:
+            file.write(tracer.prometheus_text())
@@ -7,28 +7,60 @@ Developer Email: saurabhzinjad@gmail.com
 Copyright (c) 2023-2024 Saurabh Zinjad. All rights reserved | https://github.com/Ztrimus
 -----------------------------------------------------------------------
 '''
+import os
 import re
+import csv
 import json
 import math
+import time
+import argparse
+import functools
+from collections import Counter
 import numpy as np
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics import pairwise
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
 from zlm.utils.utils import key_value_chunking
+from zlm.utils.cache import get_default_cache_dir
+from zlm.utils.tracing import traced
+from zlm.variables import TFIDF_CORPUS_FILES, TFIDF_MODEL_PATH, NLTK_DATA_DIR
 
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer, WordNetLemmatizer
 from nltk.tokenize import word_tokenize
-nltk.download('averaged_perceptron_tagger')
-nltk.download('stopwords')
-nltk.download('punkt')
+
+# NLTK data used by normalize_text; word_tokenize needs punkt_tab on NLTK >= 3.9 and punkt before
+NLTK_RESOURCES = {"punkt": "tokenizers/punkt", "punkt_tab": "tokenizers/punkt_tab", "stopwords": "corpora/stopwords"}
+
+def get_nltk_data_dir() -> str:
+    return NLTK_DATA_DIR or os.path.join(get_default_cache_dir(), "nltk_data")
+
+def use_nltk_data_dir():
+    """Makes NLTK search the local data directory first. Nothing is downloaded."""
+    data_dir = get_nltk_data_dir()
+    if data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+
+def find_nltk_resource(name: str) -> str:
+    """Returns the path of an NLTK resource, or None when it is not installed."""
+    use_nltk_data_dir()
+    try:
+        return str(nltk.data.find(NLTK_RESOURCES[name]))
+    except LookupError:
+        return None
+
+PAIR_METRICS = ("jaccard_similarity", "overlap_coefficient", "cosine_similarity")
+# Metrics score_table also accepts: "vector_embedding_similarity" (needs llm) and "corpus_cosine_similarity" (needs a fitted CorpusTfidfModel)
+
+# The analyzer of a default TfidfVectorizer: lowercase, words of two or more word characters
+_tfidf_analyzer = TfidfVectorizer().build_analyzer()
 
 def remove_urls(list_of_strings):
     """Removes strings containing URLs from a list using regular expressions."""
     filtered_list = [string for string in list_of_strings if not re.search(r"https?://\S+", string)]
     return filtered_list
 
+@traced("metrics.overlap_coefficient")
 def overlap_coefficient(document1: str, document2: str) -> float:
     """Calculate the overlap coefficient between two documents.
 
@@ -43,10 +75,9 @@ def overlap_coefficient(document1: str, document2: str) -> float:
     Returns:
         float: The overlap coefficient between the two documents.
     """    
-    # List the unique words in a document
-    words_in_document1 = set(normalize_text(document1))
-    words_in_document2 = set(normalize_text(document2))
+    return _overlap_coefficient(set(normalize_text(document1)), set(normalize_text(document2)))
 
+def _overlap_coefficient(words_in_document1: set, words_in_document2: set) -> float:
     # Find the intersection of words list of document1 & document2
     intersection = words_in_document1.intersection(words_in_document2)
 
@@ -58,6 +89,7 @@ def overlap_coefficient(document1: str, document2: str) -> float:
 
     return overlap_coefficient
     
+@traced("metrics.jaccard_similarity")
 def jaccard_similarity(document1: str, document2: str) -> float:
     """Calculate the Jaccard similarity between two documents.
 
@@ -72,10 +104,9 @@ def jaccard_similarity(document1: str, document2: str) -> float:
     Returns:
         float: The Jaccard similarity between the two documents.
     """    
-    # List the unique words in a document
-    words_in_document1 = set(normalize_text(document1))
-    words_in_document2 = set(normalize_text(document2))
+    return _jaccard_similarity(set(normalize_text(document1)), set(normalize_text(document2)))
 
+def _jaccard_similarity(words_in_document1: set, words_in_document2: set) -> float:
     # Find the intersection of words list of document1 & document2
     intersection = words_in_document1.intersection(words_in_document2)
 
@@ -90,6 +121,7 @@ def jaccard_similarity(document1: str, document2: str) -> float:
 
     return jaccard_similarity
 
+@traced("metrics.cosine_similarity")
 def cosine_similarity(document1: str, document2: str) -> float:
     """Calculate the cosine similarity between two documents.
 
@@ -100,41 +132,251 @@ def cosine_similarity(document1: str, document2: str) -> float:
     Returns:
         float: The cosine similarity between the two documents.
     """
-    # Create a TF-IDF vectorizer
-    vectorizer = TfidfVectorizer()
+    return _tfidf_cosine_similarity(Counter(_tfidf_analyzer(document1)), Counter(_tfidf_analyzer(document2)))
 
-    # Transform the documents into TF-IDF vectors
-    vectors = vectorizer.fit_transform([document1, document2])
+def _tfidf_cosine_similarity(term_counts1: Counter, term_counts2: Counter) -> float:
+    """Cosine similarity of the TF-IDF vectors a default TfidfVectorizer fitted on just these two documents would produce.
 
-    cosine_similarity_score = pairwise.cosine_similarity(vectors[0], vectors[1])
-    # Calculate the cosine similarity between the two vectors
-    # cosine_similarity = np.dot(vectors[0], vectors[1].T) / (np.linalg.norm(vectors[0].toarray()) * np.linalg.norm(vectors[1].toarray()))
+    With two documents the smoothed idf, ln((1 + n) / (1 + df)) + 1, is 1 for terms in both documents
+    and ln(3 / 2) + 1 for terms in one, so the vectors follow from the raw term counts without fitting.
+    """
+    single_idf = math.log(1.5) + 1
+    norm1 = math.sqrt(sum((count * (1.0 if term in term_counts2 else single_idf)) ** 2 for term, count in term_counts1.items()))
+    norm2 = math.sqrt(sum((count * (1.0 if term in term_counts1 else single_idf)) ** 2 for term, count in term_counts2.items()))
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
 
-    return cosine_similarity_score.item()
+    dot = sum(count * term_counts2[term] for term, count in term_counts1.items() if term in term_counts2)
+    return dot / (norm1 * norm2)
 
+@traced("metrics.vector_embedding_similarity")
 def vector_embedding_similarity(llm, document1: str, document2: str) -> float:
+    """Calculate the mean cosine similarity between the key-value chunks of two JSON documents.
+
+    All chunks of both documents are embedded in one batched call, and the
+    similarity of every chunk pair comes from a single matrix product.
+
+    Args:
+        llm (DeepSeekModel): The model used to embed the chunks.
+        document1 (str): The first document, as a JSON string.
+        document2 (str): The second document, as a JSON string.
+
+    Returns:
+        float: The mean pairwise cosine similarity of the chunk embeddings.
+    """
     document1_chunks = key_value_chunking(json.loads(document1))
     document2_chunks = key_value_chunking(json.loads(document2))
-    
-    emb_1 = []
-    emb_2 = []
 
-    # Send data in chunks to the API
-    chunk_size = 1024
-    for i in range(0, len(document1_chunks), chunk_size):
-        chunk = document1_chunks[i:i + chunk_size]
-        emb_1.extend(llm.get_embedding(chunk, model="deepseek-ai/DeepSeek-V3-0324", task_type="retrieval_query", trust_remote_code=True))
+    if not document1_chunks or not document2_chunks:
+        return 0.0
+
+    embeddings = llm.get_embeddings(document1_chunks + document2_chunks)
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+    emb_1 = embeddings[:len(document1_chunks)]
+    emb_2 = embeddings[len(document1_chunks):]
+
+    return float((emb_1 @ emb_2.T).mean())
+
+def prepare_document(document: str) -> dict:
+    """Normalizes a document once into every representation the pair metrics need.
+
+    Args:
+        document (str): The document.
+
+    Returns:
+        dict: "words" is the set of normalized words (jaccard, overlap) and "term_counts" the
+            TF-IDF analyzer's term counts (cosine).
+    """
+    return {"words": set(normalize_text(document)), "term_counts": Counter(_tfidf_analyzer(document))}
+
+@traced("metrics.score_table")
+def score_table(documents: dict, pairs: dict, metrics: list = PAIR_METRICS, llm=None) -> dict:
+    """Scores every pair of documents with every metric, normalizing each document only once.
+
+    Args:
+        documents (dict): Document name -> document text.
+        pairs (dict): Score name -> (document name, document name).
+        metrics (list, optional): Metric names; "vector_embedding_similarity" also needs `llm`.
+        llm (DeepSeekModel, optional): The model used to embed documents for vector_embedding_similarity.
+
+    Returns:
+        dict: Metric name -> score name -> score.
+    """
+    prepared = {name: prepare_document(document) for name, document in documents.items()}
+    if "corpus_cosine_similarity" in metrics:
+        # One transform for every document, then one sparse product for every pair
+        names = list(documents)
+        corpus_similarities = get_corpus_tfidf_model().similarity_matrix([documents[name] for name in names])
+        index = {name: i for i, name in enumerate(names)}
+
+    table = dict()
+    for metric in metrics:
+        table[metric] = dict()
+        for score_name, (name1, name2) in pairs.items():
+            document1, document2 = prepared[name1], prepared[name2]
+            if metric == "jaccard_similarity":
+                score = _jaccard_similarity(document1["words"], document2["words"])
+            elif metric == "overlap_coefficient":
+                score = _overlap_coefficient(document1["words"], document2["words"])
+            elif metric == "cosine_similarity":
+                score = _tfidf_cosine_similarity(document1["term_counts"], document2["term_counts"])
+            elif metric == "corpus_cosine_similarity":
+                score = float(corpus_similarities[index[name1], index[name2]])
+            elif metric == "vector_embedding_similarity":
+                score = vector_embedding_similarity(llm, documents[name1], documents[name2])
+            else:
+                raise ValueError(f"Unknown metric '{metric}'.")
+            table[metric][score_name] = score
+    return table
+
+class CorpusTfidfModel:
+    """
+    A TF-IDF model fitted once on a resume/job description corpus and reused for every comparison.
+
+    Unlike cosine_similarity, which only knows the two documents it compares, the idf weights come
+    from the whole corpus, so common resume vocabulary weighs little and distinctive skills weigh a
+    lot. New documents are only transformed. Rows are L2-normalized, so cosine similarities of many
+    documents against many others are one sparse matrix product.
+
+    Args:
+        vectorizer (TfidfVectorizer): A fitted vectorizer.
+
+    Methods:
+        fit(documents: list, **vectorizer_options) -> CorpusTfidfModel: Fits a model on a corpus.
+        from_csv(files: list) -> CorpusTfidfModel: Fits a model on (CSV file, text column) pairs.
+        load(model_path: str) -> CorpusTfidfModel: Loads a saved model.
+        save(model_path: str) -> None: Saves the model with joblib.
+        transform(documents: list): Returns the sparse TF-IDF matrix of documents.
+        similarity_matrix(documents1: list, documents2: list): Returns the sparse N x M cosine similarity matrix.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, corpus_size: int = None):
+        self.vectorizer = vectorizer
+        self.corpus_size = corpus_size
+
+    @classmethod
+    def fit(cls, documents: list, **vectorizer_options):
+        options = dict(sublinear_tf=True, min_df=2, max_df=0.95, dtype=np.float32)
+        options.update(vectorizer_options)
+        vectorizer = TfidfVectorizer(**options)
+        vectorizer.fit(documents)
+        return cls(vectorizer, corpus_size=len(documents))
+
+    @classmethod
+    def from_csv(cls, files: list = TFIDF_CORPUS_FILES, **vectorizer_options):
+        documents = []
+        for file_path, column in files:
+            with open(file_path, newline="", encoding="utf-8") as file:
+                documents += [row[column] for row in csv.DictReader(file) if row.get(column)]
+        return cls.fit(documents, **vectorizer_options)
+
+    @classmethod
+    def load(cls, model_path: str):
+        saved = joblib.load(model_path)
+        return cls(saved["vectorizer"], corpus_size=saved["corpus_size"])
+
+    def save(self, model_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+        joblib.dump({"vectorizer": self.vectorizer, "corpus_size": self.corpus_size, "fitted_at": time.time()}, model_path)
+
+    def transform(self, documents: list):
+        return self.vectorizer.transform(documents)
+
+    @traced("metrics.corpus_similarity_matrix")
+    def similarity_matrix(self, documents1: list, documents2: list = None):
+        """
+        Returns the cosine similarities between documents1 (rows) and documents2 (columns).
+
+        Args:
+            documents1 (list): N documents, e.g. resumes.
+            documents2 (list, optional): M documents, e.g. job descriptions. Defaults to documents1.
+
+        Returns:
+            scipy.sparse.csr_matrix: The N x M similarity matrix; pairs without shared vocabulary are not stored.
+        """
+        matrix1 = self.transform(documents1)
+        matrix2 = matrix1 if documents2 is None else self.transform(documents2)
+        return (matrix1 @ matrix2.T).tocsr()
+
+def get_tfidf_model_path() -> str:
+    return TFIDF_MODEL_PATH or os.path.join(get_default_cache_dir(), "tfidf_model.joblib")
+
+_corpus_tfidf_model = None
+
+def get_corpus_tfidf_model() -> CorpusTfidfModel:
+    """Returns the saved corpus TF-IDF model, loading it on first use."""
+    global _corpus_tfidf_model
+    if _corpus_tfidf_model is None:
+        model_path = get_tfidf_model_path()
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No corpus TF-IDF model at {model_path}. Fit one with `python -m zlm.utils.metrics fit-tfidf`.")
+        _corpus_tfidf_model = CorpusTfidfModel.load(model_path)
+    return _corpus_tfidf_model
+
+class TextNormalizer:
+    """
+    Normalizes texts into stemmed words, keeping the stopword set, stemmer and stems between calls.
+
+    Normalization is tokenization, stripping non-letters, lowercasing, removing stopwords and Porter
+    stemming. Stems are memoized in a bounded LRU cache, since resumes and job descriptions reuse a
+    small vocabulary. The "regex" tokenizer splits on runs of letters instead of running NLTK's
+    word_tokenize; it is several times faster but splits contractions and hyphenated words differently.
 
-    for i in range(0, len(document2_chunks), chunk_size):
-        chunk = document2_chunks[i:i + chunk_size]
-        emb_2.extend(llm.get_embedding(chunk, model="deepseek-ai/DeepSeek-V3-0324", task_type="retrieval_query", trust_remote_code=True))
+    NLTK data is resolved when a normalizer is created, not at import. Without the punkt tokenizer the
+    "nltk" tokenizer falls back to "regex", and without the NLTK stopwords scikit-learn's English stop
+    words are used, so normalization works offline with slightly different tokens.
 
-    df1 = pd.DataFrame(emb_1)
-    df2 = pd.DataFrame(emb_2)
+    Args:
+        tokenizer (str, optional): "nltk" (word_tokenize) or "regex". Defaults to "nltk".
+        stem_cache_size (int, optional): Number of memoized stems. 0 disables memoization. Defaults to 100000.
 
-    emb_sem = pairwise.cosine_similarity(df1, df2)
+    Methods:
+        tokenize(text: str) -> list: Returns the lowercased letter-only tokens.
+        normalize(text: str) -> list: Returns the normalized words of one text.
+        normalize_many(texts: list) -> list: Returns the normalized words of every text.
+    """
 
-    return emb_sem.mean()
+    def __init__(self, tokenizer: str = "nltk", stem_cache_size: int = 100000):
+        if tokenizer not in ("nltk", "regex"):
+            raise ValueError(f"Unknown tokenizer '{tokenizer}'. Use 'nltk' or 'regex'.")
+        use_nltk_data_dir()
+        if tokenizer == "nltk":
+            try:
+                word_tokenize("Loads the tokenizer.")
+            except LookupError:
+                print("NLTK punkt tokenizer not found, using the regex tokenizer. Install it with `python -m zlm.utils.metrics nltk-bundle`.")
+                tokenizer = "regex"
+        self.tokenizer = tokenizer
+
+        try:
+            self.stop_words = frozenset(stopwords.words('english'))
+        except LookupError:
+            print("NLTK stopwords not found, using scikit-learn's English stop words. Install them with `python -m zlm.utils.metrics nltk-bundle`.")
+            self.stop_words = frozenset(ENGLISH_STOP_WORDS)
+        self.stem = functools.lru_cache(maxsize=stem_cache_size)(PorterStemmer().stem)
+
+    def tokenize(self, text: str) -> list:
+        if self.tokenizer == "regex":
+            return _LETTERS.findall(text.lower())
+        return [_NON_LETTERS.sub('', word).lower() for word in word_tokenize(text)]
+
+    def normalize(self, text: str) -> list:
+        stop_words, stem = self.stop_words, self.stem
+        return [stem(word) for word in self.tokenize(text) if word and word not in stop_words]
+
+    def normalize_many(self, texts: list) -> list:
+        return [self.normalize(text) for text in texts]
+
+_LETTERS = re.compile('[a-z]+')
+_NON_LETTERS = re.compile('[^a-zA-Z]')
+_normalizers = dict()
+
+def get_normalizer(tokenizer: str = "nltk") -> TextNormalizer:
+    """Returns the process-wide normalizer for a tokenizer, creating it on first use."""
+    if tokenizer not in _normalizers:
+        _normalizers[tokenizer] = TextNormalizer(tokenizer)
+    return _normalizers[tokenizer]
 
 def normalize_text(text: str) -> list:
     """Normalize the input text.
@@ -147,26 +389,48 @@ def normalize_text(text: str) -> list:
 
     Returns:
         list: The list of normalized words.
-    """    
-    # Step 1: Tokenization
-    words = word_tokenize(text)
-
-    # Step 2: Data Cleaning - Remove Stopwords and Punctuations 
-    words = [re.sub('[^a-zA-Z]', '', word).lower() for word in words]
-
-    # Step 3: Remove empty tokens
-    words = [word for word in words if len(word)] 
-
-    # Step 4: Remove Stopwords
-    stop_words = set(stopwords.words('english'))
-    words = [word for word in words if word not in stop_words]
-
-    # Step 5: Stemming
-    stemmer = PorterStemmer()
-    words = [stemmer.stem(word) for word in words]
-
-    #STEP 3 : LEMMATIZATION
-    # lemmatizer=WordNetLemmatizer()
-    # words=[lemmatizer.lemmatize(word) for word in words]
-    
-    return words 
\ No newline at end of file
+    """
+    return get_normalizer().normalize(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance commands for the resume metrics.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = subparsers.add_parser("fit-tfidf", help="Fit the corpus TF-IDF model and save it.")
+    fit_parser.add_argument("-c", "--csv", nargs=2, action="append", metavar=("FILE", "COLUMN"),
+                            help="CSV file and text column of the corpus; repeatable. Defaults to TFIDF_CORPUS_FILES.")
+    fit_parser.add_argument("-o", "--output", help="Model path. Defaults to TFIDF_MODEL_PATH.")
+    fit_parser.add_argument("--min_df", type=int, default=2, help="Ignore terms in fewer documents than this.")
+
+    bundle_parser = subparsers.add_parser("nltk-bundle", help="Download the NLTK data normalize_text uses into the local data directory.")
+    bundle_parser.add_argument("-d", "--data_dir", help="Target directory. Defaults to NLTK_DATA_DIR.")
+    verify_parser = subparsers.add_parser("nltk-verify", help="Check that the NLTK data normalize_text uses is installed.")
+
+    args = parser.parse_args()
+
+    if args.command == "fit-tfidf":
+        start_time = time.time()
+        model = CorpusTfidfModel.from_csv(args.csv or TFIDF_CORPUS_FILES, min_df=args.min_df)
+        model_path = args.output or get_tfidf_model_path()
+        model.save(model_path)
+        print(f"Fitted on {model.corpus_size} documents ({len(model.vectorizer.vocabulary_)} terms) in {time.time() - start_time:.1f} seconds, saved to {model_path}")
+
+    elif args.command == "nltk-bundle":
+        data_dir = args.data_dir or get_nltk_data_dir()
+        for name in NLTK_RESOURCES:
+            nltk.download(name, download_dir=data_dir, quiet=True)
+        if args.data_dir and args.data_dir != get_nltk_data_dir():
+            nltk.data.path.insert(0, data_dir)
+            print(f"Set NLTK_DATA_DIR = {data_dir!r} in zlm/variables.py to use this directory.")
+
+    if args.command in ("nltk-bundle", "nltk-verify"):
+        missing = []
+        for name in NLTK_RESOURCES:
+            resource_path = find_nltk_resource(name)
+            print(f"{name:<12}{resource_path or 'missing'}")
+            if resource_path is None:
+                missing.append(name)
+        # word_tokenize only needs one of the two punkt formats, depending on the NLTK version
+        if "stopwords" in missing or {"punkt", "punkt_tab"} <= set(missing):
+            raise SystemExit(f"Missing NLTK data in {get_nltk_data_dir()}; normalize_text will use its fallbacks.")
@@ -0,0 +1,188 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/model_registry.py
+Creation Time: Oct 18th 2026, 11:05 am
+-----------------------------------------------------------------------
+'''
+import gc
+import time
+import threading
+from collections import OrderedDict
+
+from zlm.utils.backends import load_pipeline
+
+
+def get_memory_footprint(client) -> int:
+    """Returns the resident size in bytes of the weights held by a pipeline."""
+    model = getattr(client, "model", client)
+    try:
+        return int(model.get_memory_footprint())
+    except Exception:
+        pass
+    try:
+        return sum(param.numel() * param.element_size() for param in model.parameters())
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """
+    A process-wide registry that hands out one loaded pipeline per (model, device, dtype, backend).
+
+    Loaded pipelines are kept in least-recently-used order. When the summed
+    memory footprint goes above `max_bytes`, the least recently used entries
+    are dropped until the registry fits again (the entry just requested is
+    never evicted). Eviction only frees memory once nothing else references
+    the pipeline, so callers should fetch it from the registry when they use
+    it rather than keep it (DeepSeekModel does); a later request for an
+    evicted entry loads it again.
+
+    Args:
+        max_bytes (int, optional): Memory ceiling for all loaded models. None disables eviction.
+        loader (callable, optional): Function building a pipeline. Defaults to zlm.utils.backends.load_pipeline.
+
+    Methods:
+        get_pipeline(model: str, task: str, device: str, torch_dtype: str, backend: str, **kwargs): Returns a shared pipeline.
+        peek(model: str, task: str, device: str, torch_dtype: str, backend: str): Returns a loaded pipeline without counting a hit.
+        evict(model: str, task: str, device: str, torch_dtype: str, backend: str) -> bool: Drops one entry.
+        clear() -> None: Drops every entry.
+        stats() -> dict: Returns per-entry memory, load time and reuse counters.
+    """
+
+    def __init__(self, max_bytes: int = None, loader=load_pipeline):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = dict()
+        self.evictions = 0
+
+    @staticmethod
+    def _key(model, task, device, torch_dtype, backend):
+        return (task, model, str(device), str(torch_dtype), backend)
+
+    def get_pipeline(self, model: str, task: str = "text-generation", device: str = None, torch_dtype: str = None, backend: str = "transformers", **kwargs):
+        key = self._key(model, task, device, torch_dtype, backend)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry["hits"] += 1
+                entry["last_used"] = time.time()
+                return entry["client"]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; the others wait and then reuse it.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry["hits"] += 1
+                    entry["last_used"] = time.time()
+                    return entry["client"]
+
+            load_kwargs = dict(kwargs)
+            if device is not None:
+                load_kwargs["device"] = device
+            if torch_dtype is not None:
+                load_kwargs["torch_dtype"] = torch_dtype
+
+            start_time = time.time()
+            client = self.loader(task, model=model, backend=backend, **load_kwargs)
+            load_time = time.time() - start_time
+
+            with self._lock:
+                self._entries[key] = {
+                    "client": client,
+                    "memory_bytes": get_memory_footprint(client),
+                    "load_time": load_time,
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                    "hits": 0,
+                }
+                self._enforce_ceiling(keep=key)
+                self._load_locks.pop(key, None)
+            print(f"Loaded {model} ({task}, device={device}, dtype={torch_dtype}, backend={backend}) in {load_time:.2f} seconds")
+            return client
+
+    def peek(self, model: str, task: str = "text-generation", device: str = None, torch_dtype: str = None, backend: str = "transformers"):
+        """
+        Returns the pipeline if it is loaded, or None, for holders re-fetching a model they already acquired.
+
+        The entry is marked recently used, but no hit is counted, so `hits` keeps measuring how often a loaded
+        model was reused by a new holder rather than how often its holders touched it.
+        """
+        key = self._key(model, task, device, torch_dtype, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            return entry["client"]
+
+    def _enforce_ceiling(self, keep):
+        if self.max_bytes is None:
+            return
+        while self._memory_in_use() > self.max_bytes:
+            victim = next((key for key in self._entries if key != keep), None)
+            if victim is None:
+                break
+            self._drop(victim)
+
+    def _memory_in_use(self):
+        return sum(entry["memory_bytes"] for entry in self._entries.values())
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.evictions += 1
+        print(f"Evicted {key[1]} ({key[0]}, device={key[2]}, dtype={key[3]}, backend={key[4]}) from model registry")
+        del entry
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def evict(self, model: str, task: str = "text-generation", device: str = None, torch_dtype: str = None, backend: str = "transformers") -> bool:
+        key = self._key(model, task, device, torch_dtype, backend)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._drop(key)
+            return True
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = [
+                {
+                    "task": key[0],
+                    "model": key[1],
+                    "device": key[2],
+                    "torch_dtype": key[3],
+                    "backend": key[4],
+                    "memory_bytes": entry["memory_bytes"],
+                    "load_time": entry["load_time"],
+                    "hits": entry["hits"],
+                    "loaded_at": entry["loaded_at"],
+                    "last_used": entry["last_used"],
+                }
+                for key, entry in self._entries.items()
+            ]
+            return {
+                "models": models,
+                "memory_bytes": self._memory_in_use(),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "total_load_time": sum(model["load_time"] for model in models),
+                "total_hits": sum(model["hits"] for model in models),
+            }
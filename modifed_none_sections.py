@@ -6,16 +6,18 @@ from fpdf import FPDF
 from langchain_groq import ChatGroq
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from zlm.utils.transcripts import TranscriptChatModel
 import re 
 
-llm = ChatGroq(
+# LLM_TRANSCRIPT_MODE=record|replay records or replays the LLM calls (see zlm.utils.transcripts)
+llm = TranscriptChatModel(ChatGroq(
     groq_api_key="",
     model="llama3-8b-8192",
     temperature=0,
     max_tokens=None,
     timeout=None,
     max_retries=2,
-)
+))
 
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
 embedding_function = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
@@ -0,0 +1,161 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/prompt_packing.py
+Creation Time: Oct 18th 2026, 1:20 pm
+-----------------------------------------------------------------------
+'''
+import re
+import json
+
+from zlm.utils.utils import key_value_chunking
+
+# Tokenizers without a real limit report this sentinel as model_max_length
+VERY_LARGE_INTEGER = int(1e20)
+
+
+def get_context_window(client, default: int = 4096) -> int:
+    """Returns the number of tokens the pipeline's model can attend to."""
+    max_length = getattr(client.tokenizer, "model_max_length", None)
+    if max_length and max_length < VERY_LARGE_INTEGER:
+        return int(max_length)
+
+    config = getattr(getattr(client, "model", None), "config", None)
+    for attribute in ("max_position_embeddings", "n_positions", "seq_length"):
+        value = getattr(config, attribute, None)
+        if value:
+            return int(value)
+    return default
+
+
+def merge_json(first, second):
+    """Deep-merges two partial JSON values produced for different chunks of the same prompt.
+
+    Dicts are merged key by key, lists are concatenated without duplicates and
+    for scalars the first non-empty value wins.
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    if isinstance(first, dict) and isinstance(second, dict):
+        merged = dict(first)
+        for key, value in second.items():
+            merged[key] = merge_json(merged.get(key), value)
+        return merged
+    if isinstance(first, list) and isinstance(second, list):
+        return first + [item for item in second if item not in first]
+    return first if first not in ("", [], {}) else second
+
+
+class PromptPacker:
+    """
+    Packs a prompt into as few generation calls as the model context allows.
+
+    Prompts are measured in tokens. A prompt that fits next to the system prompt
+    and the reserved output tokens is sent as is. Otherwise its largest blocks
+    (usually the JSON payloads of user data or the job description) are split
+    on semantic boundaries - `key_value_chunking` lines for JSON, then lines and
+    sentences for plain text - and packed greedily into chunks. Each chunk keeps
+    the rest of the prompt (the instructions) so it can be answered on its own.
+
+    Args:
+        tokenizer: The tokenizer of the model that will answer the prompts.
+        context_window (int): Total number of tokens the model can attend to.
+
+    Methods:
+        count(text: str) -> int: Returns the number of tokens in text.
+        pack(prompt: str, system_prompt: str, max_new_tokens: int) -> list: Returns the chunk prompts.
+    """
+
+    def __init__(self, tokenizer, context_window: int):
+        self.tokenizer = tokenizer
+        self.context_window = context_window
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def pack(self, prompt: str, system_prompt: str = "", max_new_tokens: int = 0) -> list:
+        budget = self.context_window - max_new_tokens - self.count(system_prompt) - 1
+        if budget <= 0:
+            raise ValueError(f"Context window of {self.context_window} tokens leaves no room for the prompt.")
+
+        if self.count(prompt) <= budget:
+            return [prompt]
+
+        blocks = re.split(r"(\n\s*\n)", prompt)
+        sizes = {index: self.count(block) for index, block in enumerate(blocks) if index % 2 == 0}
+
+        # Move the biggest blocks into the payload until the remaining frame uses at most half the budget
+        payload = []
+        frame_tokens = sum(sizes.values())
+        for index in sorted(sizes, key=sizes.get, reverse=True):
+            if frame_tokens <= budget // 2 and payload:
+                break
+            payload.append(index)
+            frame_tokens -= sizes[index]
+
+        chunk_budget = budget - frame_tokens
+        units = []
+        for index in sorted(payload):
+            units.extend(self._split(blocks[index], chunk_budget))
+
+        chunks = []
+        current, current_tokens = [], 0
+        for unit in units:
+            unit_tokens = self.count(unit) + 1
+            if current and current_tokens + unit_tokens > chunk_budget:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+        if current:
+            chunks.append("\n".join(current))
+
+        first_payload = min(payload)
+        packed = []
+        for chunk in chunks:
+            parts = [
+                chunk if index == first_payload else block
+                for index, block in enumerate(blocks)
+                if index not in payload or index == first_payload
+            ]
+            packed.append("".join(parts))
+        return packed
+
+    def _split(self, block: str, budget: int) -> list:
+        if self.count(block) <= budget:
+            return [block]
+
+        units = []
+        for line in block.split("\n"):
+            if self.count(line) <= budget:
+                units.append(line)
+                continue
+
+            try:
+                data = json.loads(line)
+            except ValueError:
+                data = None
+
+            if isinstance(data, (dict, list)):
+                pieces = key_value_chunking(data)
+            else:
+                pieces = re.split(r"(?<=[.!?;])\s+", line)
+
+            for piece in pieces:
+                if self.count(piece) <= budget:
+                    units.append(piece)
+                else:
+                    units.extend(self._split_words(piece, budget))
+        return units
+
+    def _split_words(self, text: str, budget: int) -> list:
+        pieces, current = [], []
+        for word in text.split(" "):
+            if current and self.count(" ".join(current + [word])) > budget:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
@@ -0,0 +1,159 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/scheduler.py
+Creation Time: Oct 19th 2026, 9:30 am
+-----------------------------------------------------------------------
+'''
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from zlm.utils.tracing import tracer, propagate
+
+
+class StageTimeoutError(TimeoutError):
+    pass
+
+
+class StageSkippedError(RuntimeError):
+    pass
+
+
+class StageScheduler:
+    """
+    Runs pipeline stages as a dependency graph, concurrently where the graph allows.
+
+    A stage is a callable that receives the results of its dependencies as
+    keyword arguments named after them. Every stage starts as soon as all of
+    its dependencies have finished. A stage that raises or exceeds its timeout
+    is marked failed and every stage depending on it is skipped; independent
+    stages keep running. A timed-out stage cannot be interrupted, so its thread
+    finishes in the background and its result is discarded.
+
+    Args:
+        max_workers (int, optional): Maximum number of stages running at once. Defaults to 4.
+
+    Methods:
+        add(name: str, func: callable, deps: list, timeout: float) -> None: Registers a stage.
+        run() -> dict: Runs every stage and returns the results of the successful ones.
+        critical_path() -> list: Returns the chain of stages that determined the wall time.
+        report() -> str: Returns a timing report with the critical path.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.stages = dict()
+        self.results = dict()
+        self.errors = dict()
+        self.timings = dict()
+        self.started_at = None
+        self.finished_at = None
+
+    def add(self, name: str, func, deps: list = (), timeout: float = None):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already registered.")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'. Add stages after their dependencies.")
+        self.stages[name] = {"func": func, "deps": list(deps), "timeout": timeout}
+
+    def _ready(self, pending):
+        ready = []
+        for name in pending:
+            deps = self.stages[name]["deps"]
+            if any(dep in self.errors for dep in deps):
+                failed = [dep for dep in deps if dep in self.errors]
+                self.errors[name] = StageSkippedError(f"Skipped because {', '.join(failed)} failed.")
+                ready.append(name)
+            elif all(dep in self.results for dep in deps):
+                ready.append(name)
+        return ready
+
+    @staticmethod
+    def _run_stage(name, func, kwargs):
+        with tracer.span(f"stage.{name}"):
+            return func(**kwargs)
+
+    def run(self) -> dict:
+        self.started_at = time.time()
+        pending = list(self.stages)
+        running = dict()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                for name in self._ready(pending):
+                    pending.remove(name)
+                    if name in self.errors:
+                        continue
+                    stage = self.stages[name]
+                    kwargs = {dep: self.results[dep] for dep in stage["deps"]}
+                    self.timings[name] = {"start": time.time() - self.started_at}
+                    running[executor.submit(propagate(self._run_stage), name, stage["func"], kwargs)] = name
+
+                if not running:
+                    break
+
+                now = time.time()
+                deadlines = [
+                    self.started_at + self.timings[name]["start"] + self.stages[name]["timeout"]
+                    for name in running.values()
+                    if self.stages[name]["timeout"] is not None
+                ]
+                wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+                done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    self.timings[name]["end"] = time.time() - self.started_at
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        print(f"Stage {name} failed: {e}")
+                        self.errors[name] = e
+
+                now = time.time()
+                for future, name in list(running.items()):
+                    timeout = self.stages[name]["timeout"]
+                    if timeout is not None and now - (self.started_at + self.timings[name]["start"]) >= timeout:
+                        running.pop(future)
+                        self.timings[name]["end"] = now - self.started_at
+                        self.errors[name] = StageTimeoutError(f"Stage {name} exceeded its {timeout} seconds timeout.")
+                        print(self.errors[name])
+        finally:
+            executor.shutdown(wait=False)
+
+        self.finished_at = time.time()
+        return self.results
+
+    def critical_path(self) -> list:
+        finished = [name for name in self.timings if "end" in self.timings[name]]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda name: self.timings[name]["end"])]
+        while True:
+            deps = [dep for dep in self.stages[path[-1]]["deps"] if dep in self.timings and "end" in self.timings[dep]]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda name: self.timings[name]["end"]))
+        return list(reversed(path))
+
+    def report(self) -> str:
+        lines = [f"{'stage':<16}{'start s':>10}{'end s':>10}{'duration s':>12}  status"]
+        for name in self.stages:
+            timing = self.timings.get(name)
+            if name in self.errors:
+                status = f"failed: {self.errors[name]}"
+            else:
+                status = "ok"
+            if timing is None or "end" not in timing:
+                lines.append(f"{name:<16}{'-':>10}{'-':>10}{'-':>12}  {status}")
+            else:
+                lines.append(f"{name:<16}{timing['start']:>10.2f}{timing['end']:>10.2f}{timing['end'] - timing['start']:>12.2f}  {status}")
+
+        path = self.critical_path()
+        wall_time = (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0
+        stage_time = sum(t["end"] - t["start"] for t in self.timings.values() if "end" in t)
+        lines.append(f"Critical path: {' -> '.join(path)}")
+        lines.append(f"Wall time: {wall_time:.2f} seconds (sum of stage times: {stage_time:.2f} seconds)")
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/tracing.py
+Creation Time: Oct 19th 2026, 2:30 pm
+-----------------------------------------------------------------------
+'''
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_current_span = contextvars.ContextVar("zlm_current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, error: Exception):
+        """Marks the span failed, for errors that are handled inside it instead of propagating."""
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    """
+    Records nested timing spans and counters for the resume pipeline.
+
+    Spans nest through a context variable, so a span opened inside another one
+    (in the same thread, or in a thread started with `propagate`) becomes its
+    child. Finished spans are kept in a bounded buffer and, when `ZLM_TRACE_FILE`
+    is set, appended to that file as JSON lines. Latencies, errors and numeric
+    `*_tokens` attributes are aggregated per span name for the Prometheus export.
+
+    Args:
+        max_spans (int, optional): Number of finished spans kept in memory. Defaults to 10000.
+        jsonl_path (str, optional): File to append finished spans to. Defaults to $ZLM_TRACE_FILE.
+
+    Methods:
+        span(name: str, **attributes): Context manager opening a child of the current span.
+        increment(name: str, value: float, **labels) -> None: Adds to a counter.
+        export_jsonl(file_path: str) -> int: Writes the buffered spans as JSON lines.
+        prometheus_text() -> str: Returns the aggregated metrics in Prometheus text format.
+    """
+
+    def __init__(self, max_spans: int = 10000, jsonl_path: str = None):
+        self.spans = deque(maxlen=max_spans)
+        self.jsonl_path = jsonl_path if jsonl_path is not None else os.environ.get("ZLM_TRACE_FILE")
+        self._lock = threading.Lock()
+        self._latency = defaultdict(lambda: {"count": 0, "sum": 0.0, "errors": 0, "buckets": [0] * len(LATENCY_BUCKETS)})
+        self._tokens = defaultdict(float)
+        self._counters = defaultdict(float)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.time() - span.start
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            stats = self._latency[span.name]
+            stats["count"] += 1
+            stats["sum"] += span.duration
+            stats["errors"] += span.error is not None
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if span.duration <= bound:
+                    stats["buckets"][index] += 1
+            for key, value in span.attributes.items():
+                if key.endswith("_tokens") and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._tokens[(span.name, key)] += value
+
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as file:
+                    file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def increment(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def export_jsonl(self, file_path: str) -> int:
+        with self._lock:
+            spans = list(self.spans)
+        with open(file_path, "w") as file:
+            for span in spans:
+                file.write(json.dumps(span.to_dict(), default=str) + "\n")
+        return len(spans)
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP zlm_span_duration_seconds Latency of traced operations.",
+            "# TYPE zlm_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, stats in sorted(self._latency.items()):
+                for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                    lines.append(f'zlm_span_duration_seconds_bucket{{name="{name}",le="{bound}"}} {count}')
+                lines.append(f'zlm_span_duration_seconds_bucket{{name="{name}",le="+Inf"}} {stats["count"]}')
+                lines.append(f'zlm_span_duration_seconds_sum{{name="{name}"}} {stats["sum"]:.6f}')
+                lines.append(f'zlm_span_duration_seconds_count{{name="{name}"}} {stats["count"]}')
+
+            lines += ["# HELP zlm_span_errors_total Traced operations that raised.", "# TYPE zlm_span_errors_total counter"]
+            for name, stats in sorted(self._latency.items()):
+                lines.append(f'zlm_span_errors_total{{name="{name}"}} {stats["errors"]}')
+
+            lines += ["# HELP zlm_tokens_total Tokens processed by traced operations.", "# TYPE zlm_tokens_total counter"]
+            for (name, kind), value in sorted(self._tokens.items()):
+                lines.append(f'zlm_tokens_total{{name="{name}",kind="{kind[:-len("_tokens")]}"}} {value:g}')
+
+            for (name, labels), value in sorted(self._counters.items()):
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"zlm_{name}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+tracer = Tracer()
+
+
+def traced(name: str = None):
+    """Decorator recording every call of the function as a span."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """Returns the innermost open span of the current context, or None."""
+    return _current_span.get()
+
+
+def propagate(func):
+    """Binds func to a copy of the current context, so spans it opens in another thread nest under the current span."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)
+
+
+_metrics_server = None
+
+
+def serve_metrics(port: int = 9464, host: str = "0.0.0.0"):
+    """Starts (once per process) an HTTP endpoint serving the Prometheus text format on /metrics."""
+    global _metrics_server
+    if _metrics_server is not None:
+        return _metrics_server
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return _metrics_server
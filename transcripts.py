@@ -0,0 +1,171 @@
+'''
+-----------------------------------------------------------------------
+File: zlm/utils/transcripts.py
+Creation Time: Oct 19th 2026, 4:10 pm
+-----------------------------------------------------------------------
+'''
+import os
+import json
+import gzip
+import time
+import threading
+from collections import defaultdict
+
+from zlm.utils.cache import get_default_cache_dir, make_cache_key
+
+TRANSCRIPT_MODES = ("off", "record", "replay")
+
+
+class TranscriptStore:
+    """
+    Records LLM prompt -> response pairs with their latency, and serves them back offline.
+
+    In "record" mode every live response is appended to a gzip-compressed JSON
+    lines archive. In "replay" mode responses are read from that archive and
+    returned after the recorded latency divided by `speed`, so load tests see
+    realistic outputs and timings without calling a model. A prompt recorded
+    several times is replayed round-robin over its recordings.
+
+    Each record is written as its own gzip member, so an archive stays readable up to
+    the last finished record when the recording process is killed. Records from
+    several threads of one process are serialized, but several processes recording
+    into the same archive at once are not supported.
+
+    Args:
+        path (str): The .jsonl.gz archive.
+        mode (str, optional): "off", "record" or "replay". Defaults to "off".
+        speed (float, optional): Replay speed-up; 2 replays twice as fast, 0 without any delay. Defaults to 1.
+
+    Methods:
+        record(key: str, prompt: str, response: str, latency: float, **meta) -> None: Appends one exchange.
+        replay(key: str) -> str: Returns a recorded response, raising LookupError if there is none.
+        replay_stream(key: str): Yields a recorded response word by word, paced over its latency.
+        replay_or_record(key: str, prompt: str, produce: callable, **meta) -> str: Serves a call according to the mode.
+    """
+
+    def __init__(self, path: str, mode: str = "off", speed: float = 1.0):
+        if mode not in TRANSCRIPT_MODES:
+            raise ValueError(f"Unknown transcript mode '{mode}'. Use one of {', '.join(TRANSCRIPT_MODES)}.")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._records = defaultdict(list)
+        self._next = defaultdict(int)
+
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No LLM transcript to replay at {path}. Record one with LLM_TRANSCRIPT_MODE=record first.")
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                try:
+                    for line in file:
+                        if line.strip():
+                            record = json.loads(line)
+                            self._records[record["key"]].append(record)
+                except (EOFError, ValueError) as e:
+                    # A member cut off mid-write; every record before it is still usable
+                    print(f"LLM transcript {path} ends with an incomplete record, ignoring it: {e}")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(self, key: str, prompt: str, response: str, latency: float, **meta):
+        record = dict(meta, key=key, prompt=prompt, response=response, latency=latency, recorded_at=time.time())
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # One complete gzip member per record: nothing is left unterminated if the process dies
+            with gzip.open(self.path, "at", encoding="utf-8") as file:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _lookup(self, key: str) -> dict:
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                raise LookupError(f"Prompt {key[:12]} is not in the LLM transcript {self.path}.")
+            record = records[self._next[key] % len(records)]
+            self._next[key] += 1
+        return record
+
+    def _delay(self, latency: float) -> float:
+        return latency / self.speed if self.speed > 0 else 0.0
+
+    def replay(self, key: str) -> str:
+        record = self._lookup(key)
+        time.sleep(self._delay(record["latency"]))
+        return record["response"]
+
+    def replay_stream(self, key: str):
+        record = self._lookup(key)
+        pieces = record["response"].split(" ")
+        pause = self._delay(record["latency"]) / max(1, len(pieces))
+        for index, piece in enumerate(pieces):
+            time.sleep(pause)
+            yield piece if index == 0 else f" {piece}"
+
+    def replay_or_record(self, key: str, prompt: str, produce, **meta) -> str:
+        if self.replaying:
+            return self.replay(key)
+        if not self.recording:
+            return produce()
+
+        start_time = time.time()
+        response = produce()
+        if response is not None:
+            self.record(key, prompt, response, time.time() - start_time, **meta)
+        return response
+
+
+_transcript_store = None
+
+
+def get_transcript_store() -> TranscriptStore:
+    """
+    Returns the process-wide transcript store configured from the environment.
+
+    LLM_TRANSCRIPT_MODE is "off" (default), "record" or "replay", LLM_TRANSCRIPT_PATH the archive
+    (default ~/.cache/JobLLM_Resume_CV/transcripts.jsonl.gz) and LLM_TRANSCRIPT_SPEED the replay speed-up.
+    """
+    global _transcript_store
+    if _transcript_store is None:
+        _transcript_store = TranscriptStore(
+            os.environ.get("LLM_TRANSCRIPT_PATH") or os.path.join(get_default_cache_dir(), "transcripts.jsonl.gz"),
+            mode=os.environ.get("LLM_TRANSCRIPT_MODE", "off").strip().lower() or "off",
+            speed=float(os.environ.get("LLM_TRANSCRIPT_SPEED", "1")),
+        )
+    return _transcript_store
+
+
+class TranscriptChatModel:
+    """
+    Wraps a LangChain chat model (e.g. ChatGroq) so `invoke` is recorded or replayed by the transcript store.
+
+    Only plain prompt strings and the `.content` of the reply are transcribed, which is how the
+    Streamlit apps use the model. Every other attribute is forwarded to the wrapped model.
+    """
+
+    def __init__(self, llm, store: TranscriptStore = None):
+        self.llm = llm
+        self.store = store if store is not None else get_transcript_store()
+        self.model_name = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+
+    def invoke(self, prompt, **kwargs):
+        if not self.store.recording and not self.store.replaying:
+            return self.llm.invoke(prompt, **kwargs)
+
+        key = make_cache_key(self.model_name, str(prompt))
+        if self.store.replaying:
+            from langchain_core.messages import AIMessage
+            return AIMessage(content=self.store.replay(key))
+
+        start_time = time.time()
+        response = self.llm.invoke(prompt, **kwargs)
+        self.store.record(key, str(prompt), response.content, time.time() - start_time, model=self.model_name)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
@@ -10,9 +10,10 @@ Copyright (c) 2023 Saurabh Zinjad. All rights reserved | GitHub: Ztrimus
 
 import os
 import re
-import time
 import json
 import base64
+import hashlib
+import functools
 import platform
 import subprocess
 import streamlit as st
@@ -21,11 +22,15 @@ from fpdf import FPDF
 from markdown_pdf import MarkdownPdf, Section
 from pathlib import Path
 from datetime import datetime
-from langchain_core.output_parsers import JsonOutputParser
-from transformers import pipeline
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from zlm.utils.json_stream import IncrementalJsonParser
+from zlm.utils.tracing import tracer
 
 OS_SYSTEM = platform.system().lower()
 
+# Query parameters that only track where a visitor came from and never change the posting
+TRACKING_QUERY_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "refid", "src", "source", "trk", "trackingid", "lipi", "from"}
+
 def write_file(file_path, data):
     with open(file_path, "w") as file:
         file.write(data)
@@ -61,6 +66,22 @@ def job_doc_name(job_details: dict, output_dir: str = "output", type: str = ""):
     else:
         return os.path.join(doc_dir, f"{doc_name}_")
 
+def canonical_url(url: str) -> str:
+    """Normalizes a job URL so links to the same posting compare equal (scheme, host case, www, tracking params, fragment, trailing slash)."""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_QUERY_PARAMS
+    )
+    return urlunsplit(("https", netloc, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+def text_fingerprint(text: str) -> str:
+    """Returns the SHA-256 of a text with case and whitespace normalized, so re-pasted copies of a text match."""
+    return hashlib.sha256(re.sub(r"\s+", " ", text).strip().lower().encode("utf-8")).hexdigest()
+
 def clean_string(text: str):
     text = text.title().replace(" ", "").strip()
     text = re.sub(r"[^a-zA-Z0-9]+", "", text)
@@ -92,12 +113,12 @@ def save_log(content: any, file_name: str):
     write_file(file_path, content)
 
 def measure_execution_time(func):
+    """Records every call of func as a tracing span and prints its wall time."""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        func_run_log = f"Function {func.__name__} took {execution_time:.4f} seconds to execute"
+        with tracer.span(func.__qualname__) as span:
+            result = func(*args, **kwargs)
+        func_run_log = f"Function {func.__name__} took {span.duration:.4f} seconds to execute"
         print(func_run_log)
         return result
     return wrapper
@@ -198,24 +219,20 @@ def get_default_download_folder():
     os.makedirs(downlaod_folder_path, exist_ok=True)
     return downlaod_folder_path
 
-def parse_json_markdown(json_string: str) -> dict:
-    try:
-        if json_string[3:13].lower() == "typescript":
-            json_string = json_string.replace(json_string[3:13], "",1)
-        
-        if 'JSON_OUTPUT_ACCORDING_TO_RESUME_DATA_SCHEMA' in json_string:
-            json_string = json_string.replace("JSON_OUTPUT_ACCORDING_TO_RESUME_DATA_SCHEMA", "",1)
-        
-        if json_string[3:7].lower() == "json":
-            json_string = json_string.replace(json_string[3:7], "",1)
-    
-        parser = JsonOutputParser()
-        parsed = parser.parse(json_string)
+def parse_json_markdown(json_string: str, return_complete: bool = False) -> dict:
+    """Parses the JSON value in an LLM response, ignoring markdown fences and schema-name preambles.
 
-        return parsed
+    Truncated output (unclosed strings, arrays or objects) is repaired instead of rejected. With
+    return_complete, a (value, complete) tuple is returned, complete being False for repaired output.
+    """
+    try:
+        parser = IncrementalJsonParser()
+        parser.feed(json_string)
+        value = parser.close()
+        return (value, parser.complete) if return_complete else value
     except Exception as e:
         print(e)
-        return None
+        return (None, False) if return_complete else None
 
 def get_prompt(system_prompt_path: str) -> str:
     with open(system_prompt_path, encoding="utf-8") as file:
@@ -239,38 +256,10 @@ def key_value_chunking(data, prefix=""):
     
     return chunks
 
-class DeepSeekModel:
-    def __init__(self, api_key, system_prompt):
-        self.system_prompt = system_prompt
-        self.client = pipeline("text-generation", model="deepseek-ai/DeepSeek-V3-0324", api_key=api_key, trust_remote_code=True)
-    
-    def get_response(self, prompt, expecting_longer_output=False, need_json_output=False):
-        user_prompt = f"{self.system_prompt}\n{prompt}"
-        chunk_size = 1024
-        responses = []
-
-        try:
-            for i in range(0, len(user_prompt), chunk_size):
-                chunk = user_prompt[i:i + chunk_size]
-                completion = self.client(chunk, max_length=4000 if expecting_longer_output else None, return_full_text=False)
-                content = completion[0]['generated_text'].strip()
-                responses.append(content)
-            
-            full_response = " ".join(responses)
-            
-            if need_json_output:
-                return parse_json_markdown(full_response)
-            else:
-                return full_response
-        
-        except Exception as e:
-            print(e)
-            st.error(f"Error in Hugging Face API, {e}")
-            st.markdown("<h3 style='text-align: center;'>Please try again! Check the log in the dropdown for more details.</h3>", unsafe_allow_html=True)
-    
-    def get_embedding(self, text, model="deepseek-ai/DeepSeek-V3-0324", task_type="retrieval_document"):
-        try:
-            text = text.replace("\n", " ")
-            return self.client.embeddings.create(input = [text], model=model, trust_remote_code=True).data[0].embedding
-        except Exception as e:
-            print(e)
\ No newline at end of file
+def __getattr__(name):
+    # DeepSeekModel lives in zlm.utils.llm_models; it is resolved lazily here to keep
+    # `from zlm.utils.utils import DeepSeekModel` working without a circular import.
+    if name == "DeepSeekModel":
+        from zlm.utils.llm_models import DeepSeekModel
+        return DeepSeekModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,6 +8,8 @@ Copyright (c) 2023-2024 Saurabh Zinjad. All rights reserved | https://github.com
 -----------------------------------------------------------------------
 '''
 
+import os
+
 from zlm.prompts.sections_prompt import EXPERIENCE, SKILLS, PROJECTS, EDUCATIONS, CERTIFICATIONS, ACHIEVEMENTS
 from zlm.schemas.sections_schemas import Achievements, Certifications, Educations, Experiences, Projects, SkillSections
 from zlm.utils.utils import key_value_chunking  # Assuming this function is used for chunking
@@ -23,9 +25,64 @@ LLM_MAPPING = {
         "api_env": "HUGGINGFACE_API_KEY",
         "model": [DEEPSEEK_EMBEDDING_MODEL],
         "trust_remote_code": True,  # Added to allow custom code execution
+        # Inference backend, see zlm.utils.backends.BACKENDS: "transformers" (full precision),
+        # "int8" (dynamic int8 weight quantization, CPU) or "onnx" (exported ONNX Runtime graph)
+        "backend": "transformers",
     }
 }
 
+# Generation budget per call; prompts are packed into the remaining context window
+LLM_MAX_NEW_TOKENS = 1024
+LLM_MAX_NEW_TOKENS_LONG = 4000  # expecting_longer_output=True; both are capped at half the model context window
+
+# Reuse the key/value state of the system prompt across generations (see zlm.utils.kv_cache)
+LLM_PREFIX_KV_CACHE = True
+
+# Disk-backed LLM response cache (see zlm.utils.cache.ResponseCache)
+RESPONSE_CACHE_DIR = None  # None -> ~/.cache/JobLLM_Resume_CV
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESPONSE_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024  # embeddings never expire, only evicted by size
+RESUME_CACHE_MAX_BYTES = 64 * 1024 * 1024  # parsed resume PDFs, keyed by file content; evicted by size only
+# Bump when RESUME_DETAILS_EXTRACTOR changes meaning to re-parse every cached resume
+RESUME_EXTRACTOR_PROMPT_VERSION = 1
+JD_CACHE_MAX_BYTES = 32 * 1024 * 1024
+JD_CACHE_URL_TTL = 24 * 60 * 60  # seconds; postings behind a URL can change, pasted text is keyed by content
+
+# Shared model registry (see zlm.utils.model_registry.ModelRegistry)
+MODEL_REGISTRY_MAX_BYTES = None  # None -> never evict loaded models
+MODEL_DEVICE = None  # None -> transformers default placement
+MODEL_TORCH_DTYPE = None  # e.g. "bfloat16"; None -> model default
+
+# Number of resume sections generated concurrently in AutoApplyModel.resume_builder (1 = sequential)
+RESUME_SECTION_CONCURRENCY = 6
+
+# resume_cv_pipeline stage scheduling (see zlm.utils.scheduler.StageScheduler)
+PIPELINE_MAX_WORKERS = 4
+PIPELINE_STAGE_TIMEOUTS = {  # seconds, None -> no timeout
+    "user_data": 300,
+    "job_details": 300,
+    "resume": 900,
+    "cover_letter": 600,
+    "metrics": 120,
+}
+
+# Port of the Prometheus-style /metrics endpoint started by web_app.py (None -> not served).
+# Set ZLM_TRACE_FILE to also append every finished span to a JSON lines file.
+TRACING_METRICS_PORT = None
+
+# Corpus the TF-IDF model of zlm.utils.metrics is fitted on: (CSV file, text column) pairs.
+# Fit it with `python -m zlm.utils.metrics fit-tfidf`; None as the model path -> ~/.cache/JobLLM_Resume_CV/tfidf_model.joblib
+TFIDF_CORPUS_FILES = [
+    (os.path.join("AI-Resume", "cleaned_resume_dataset.csv"), "cleaned_resume"),
+    (os.path.join("AI-Resume", "project_list.csv"), "Project Description"),
+]
+TFIDF_MODEL_PATH = None
+
+# Where zlm.utils.metrics looks for NLTK data first (None -> ~/.cache/JobLLM_Resume_CV/nltk_data).
+# Nothing is downloaded at import; install the data once with `python -m zlm.utils.metrics nltk-bundle`.
+NLTK_DATA_DIR = None
+
 section_mapping = {
     "work_experience": {"prompt": EXPERIENCE, "schema": Experiences},
     "skill_section": {"prompt": SKILLS, "schema": SkillSections},
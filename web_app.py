@@ -16,8 +16,9 @@ import streamlit as st
 
 from zlm import AutoApplyModel
 from zlm.utils.utils import display_pdf, download_pdf, read_file, read_json
-from zlm.utils.metrics import jaccard_similarity, overlap_coefficient, cosine_similarity
-from zlm.variables import LLM_MAPPING
+from zlm.utils.metrics import score_table
+from zlm.utils.tracing import serve_metrics
+from zlm.variables import LLM_MAPPING, TRACING_METRICS_PORT
 import requests
 
 
@@ -31,6 +32,9 @@ st.set_page_config(
     }
 )
 
+if TRACING_METRICS_PORT is not None:
+    serve_metrics(TRACING_METRICS_PORT)
+
 if os.path.exists("output"):
     shutil.rmtree("output")
 
@@ -206,10 +210,15 @@ try:
                 st.toast("Resume generated successfully!", icon="✅")
                 # Calculate metrics
                 st.subheader("Resume Metrics")
+                scores = score_table(
+                    {"resume": json.dumps(resume_details), "user_data": json.dumps(user_data), "job_details": json.dumps(job_details)},
+                    {"user_personalization": ("resume", "user_data"), "job_alignment": ("resume", "job_details"), "job_match": ("user_data", "job_details")},
+                    ['overlap_coefficient', 'cosine_similarity'],
+                )
                 for metric in ['overlap_coefficient', 'cosine_similarity']:
-                    user_personalization = globals()[metric](json.dumps(resume_details), json.dumps(user_data))
-                    job_alignment = globals()[metric](json.dumps(resume_details), json.dumps(job_details))
-                    job_match = globals()[metric](json.dumps(user_data), json.dumps(job_details))
+                    user_personalization = scores[metric]["user_personalization"]
+                    job_alignment = scores[metric]["job_alignment"]
+                    job_match = scores[metric]["job_match"]
 
                     if metric == "overlap_coefficient":
                         title = "Token Space"
@@ -227,7 +236,7 @@ try:
 
             # Build Cover Letter
             if get_cover_letter_button:
-                with st.status("Building cover letter..."):
+                with st.status("Building cover letter...", expanded=True):
                     cv_details, cv_path = resume_llm.cover_letter_generator(job_details, user_data, is_st=True)
                 cv_col_1, cv_col_2 = st.columns([0.7, 0.3])
                 with cv_col_1: